@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, Optional
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # Seconds
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+
+class Cache(ABC):
+    """Interface of the response cache.
+
+    Entries are tagged with the (newspaper, day) pairs they were computed
+    from, so an article write only invalidates the entries that covered
+    its day. Values are shared between requests and must not be modified.
+    """
+
+    # True when every worker process uses the same entries, so that an
+    # invalidation reaches all of them
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str):
+        """Returns the cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = (), version: int = 0):
+        """Stores a value, unless one of its tags was invalidated after
+        `version` (the value may have been computed from stale data)."""
+
+    @abstractmethod
+    def version(self) -> int:
+        """Current invalidation version, to be taken before computing a value."""
+
+    @abstractmethod
+    def invalidate(self, tags: Iterable[str]):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        pass
+
+
+class TTLCache(Cache):
+    """In-process LRU cache with a TTL per entry."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.keys_by_tag = {}
+        self.invalidated_at = OrderedDict()  # tag -> version of its last invalidation
+        self.forgotten_version = 0  # Newest invalidation dropped from invalidated_at
+        self.current_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self.remove(key)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = (), version: int = 0):
+        tags = tuple(tags)
+        with self.lock:
+            if version < self.forgotten_version or any(
+                self.invalidated_at.get(tag, -1) > version for tag in tags
+            ):
+                return
+
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self.keys_by_tag.setdefault(tag, set()).add(key)
+
+            while len(self.entries) > self.max_entries:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def version(self) -> int:
+        with self.lock:
+            return self.current_version
+
+    def invalidate(self, tags: Iterable[str]):
+        with self.lock:
+            self.current_version += 1
+            for tag in tags:
+                self.invalidated_at[tag] = self.current_version
+                self.invalidated_at.move_to_end(tag)
+                for key in self.keys_by_tag.pop(tag, ()):
+                    if key in self.entries:
+                        self.remove(key)
+                        self.invalidations += 1
+
+            # Only values computed since then can still be in flight
+            while len(self.invalidated_at) > self.max_entries:
+                _, self.forgotten_version = self.invalidated_at.popitem(last=False)
+
+    def remove(self, key: str):
+        # Callers hold the lock
+        _, _, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_tag[tag]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class NullCache(Cache):
+    """Used when CACHE_ENABLED is off, nothing is ever cached."""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = (), version: int = 0):
+        pass
+
+    def version(self) -> int:
+        return 0
+
+    def invalidate(self, tags: Iterable[str]):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"entries": 0, "hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+cache = TTLCache() if CACHE_ENABLED else NullCache()
+
+
+def get_cache() -> Cache:
+    return cache
+
+
+def article_tags(newspaper_id: Optional[int], days: Iterable[date]):
+    """Tags of a value computed from the articles of a newspaper on the given
+    days. `newspaper_id=None` stands for values covering every newspaper."""
+    newspaper = "*" if newspaper_id is None else newspaper_id
+    return [f"articles:{newspaper}:{day.isoformat()}" for day in days]
+
+
+def newspapers_tags():
+    """Tag of the values listing newspapers, which change when a newspaper
+    is created, updated or deleted."""
+    return ["newspapers"]
+
+
+async def cached(key: str, tags: Iterable[str], compute, ttl: int = CACHE_TTL):
+    """Returns the cached value of `key`, or awaits `compute()` and caches it."""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    version = cache.version()
+    value = await compute()
+    cache.set(key, value, ttl, tags, version)
+    return value
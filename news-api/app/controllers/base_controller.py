@@ -1,16 +1,25 @@
-from typing import Dict, Generic, List, Type, TypeVar
+from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException
-from pydantic import BaseModel
+import orjson
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from peewee import IntegrityError
 
+from app.executor import run_in_db
+from app.instrumentation import TimedRoute
+from app.models.bulk_result import BulkResult
 from app.services.base_service import BaseService
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BULK_SIZE = 10000  # Items per bulk request
+
 
 class BaseController:
     def __init__(self, model, entity, service: BaseService):
         self.model = model
         self.entity = entity
-        self.router = APIRouter()
+        self.router = APIRouter(route_class=TimedRoute)
         self.service = service
 
         self.router.add_api_route(
@@ -20,31 +29,86 @@ class BaseController:
             "", self.get_all, methods=["GET"], response_model=List[model]
         )
         self.router.add_api_route(
-            "/{id}", self.get_by_id, methods=["GET"], response_model=model
+            "/bulk", self.bulk_create, methods=["POST"], response_model=BulkResult
+        )
+        self.router.add_api_route(
+            "/bulk", self.bulk_update, methods=["PATCH"], response_model=BulkResult
+        )
+        self.router.add_api_route(
+            "/bulk", self.bulk_delete, methods=["DELETE"], response_model=BulkResult
+        )
+        self.router.add_api_route(
+            "/{id:int}", self.get_by_id, methods=["GET"], response_model=model
         )
         self.router.add_api_route(
-            "/{id}", self.update, methods=["PUT"], response_model=model
+            "/{id:int}", self.update, methods=["PUT"], response_model=model
         )
-        self.router.add_api_route("/{id}", self.delete, methods=["DELETE"])
+        self.router.add_api_route("/{id:int}", self.delete, methods=["DELETE"])
 
     def get_router(self):
         return self.router
 
-    async def get_all(self):
-        return self.service.get_all()
+    async def get_all(
+        self,
+        response: Response,
+        after_id: Optional[int] = Query(None, ge=0, description="Return items with an id greater than this one"),
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+        stream: Optional[str] = Query(None, pattern="^(ndjson|array)$", description="Stream the items as NDJSON or as a JSON array"),
+    ):
+        selected_fields = self.parse_fields(fields)
+
+        if stream:
+            # Streams are not paginated unless a limit is given explicitly
+            rows = self.service.iter_all(after_id, limit, selected_fields)
+            if stream == "ndjson":
+                return StreamingResponse(
+                    stream_ndjson(rows), media_type="application/x-ndjson"
+                )
+            return StreamingResponse(
+                stream_json_array(rows), media_type="application/json"
+            )
+
+        limit = limit or DEFAULT_PAGE_SIZE
+        rows = await run_in_db(self.service.get_all, after_id, limit, selected_fields)
+
+        # Cursor for the next page, only when this page is full
+        if len(rows) == limit:
+            response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+
+        # Rows come straight from the database, they are encoded as they are
+        # instead of being validated against the response model first
+        return Response(
+            encode_rows(rows), media_type="application/json", headers=response.headers
+        )
+
+    def parse_fields(self, fields: Optional[str]):
+        if not fields:
+            return None
+
+        selected_fields = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected_fields if name not in self.model.model_fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        return selected_fields
 
     async def get_by_id(self, id: int):
-        model = self.service.get_by_id(id)
+        model = await run_in_db(self.service.get_by_id, id)
         if model is None:
             raise HTTPException(status_code=404, detail="Item not found")
         return model
 
     async def create(self, model: dict = Body(...)):
-        return self.service.create(model)
+        try:
+            return await run_in_db(self.service.create, model)
+        except IntegrityError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     async def update(self, id: int, model: dict = Body(...)):
         model["id"] = id
-        model = self.service.update(model)
+        model = await run_in_db(self.service.update, model)
 
         if model is None:
             raise HTTPException(status_code=404, detail="Not found")
@@ -52,9 +116,50 @@ class BaseController:
         return model
 
     async def delete(self, id: int):
-        is_deleted = self.service.delete(id)
+        is_deleted = await run_in_db(self.service.delete, id)
 
         if not is_deleted:
             raise HTTPException(status_code=404, detail="Not found")
 
         return {"msg": "Item deleted successfully"}
+
+    async def bulk_create(self, models: List[dict] = Body(...)):
+        check_bulk_size(models)
+        return await run_in_db(self.service.bulk_create, models)
+
+    async def bulk_update(self, models: List[dict] = Body(..., description="Items with their id and the fields to change")):
+        check_bulk_size(models)
+        return await run_in_db(self.service.bulk_update, models)
+
+    async def bulk_delete(self, ids: List[int] = Body(...)):
+        check_bulk_size(ids)
+        return await run_in_db(self.service.bulk_delete, ids)
+
+
+def check_bulk_size(items: list):
+    if len(items) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_BULK_SIZE} items per request"
+        )
+
+
+def encode_row(row: dict) -> bytes:
+    return orjson.dumps(row)
+
+
+def encode_rows(rows: List[dict]) -> bytes:
+    return orjson.dumps(rows)
+
+
+async def stream_ndjson(rows):
+    async for row in rows:
+        yield encode_row(row) + b"\n"
+
+
+async def stream_json_array(rows):
+    yield b"["
+    separator = b""
+    async for row in rows:
+        yield separator + encode_row(row)
+        separator = b","
+    yield b"]"
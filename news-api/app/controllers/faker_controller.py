@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Query
-from faker import Faker
-from peewee import IntegrityError
-from datetime import date, timedelta
-from app.entities.news_article_entity import NewsArticleEntity
-from app.entities.newspaper_entity import NewspaperEntity
-from app.db import get_db
+from typing import Optional
 
-fake = Faker()
-faker_router = APIRouter()
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+
+from app.executor import run_in_db
+from app.instrumentation import TimedRoute
+from app.models.seed_job import SeedJob
+from app.services.seed_service import (
+    create_seed_job,
+    get_seed_job,
+    run_seed_job,
+    seed_newspapers_articles,
+)
+
+faker_router = APIRouter(route_class=TimedRoute)
 
 
 def get_faker_router():
@@ -19,45 +24,33 @@ async def create_newspapers_articles(
     newspapers_count: int = Query(..., description="Number of newspapers to create"),
     articles_count: int = Query(..., description="Number of articles per newspaper"),
 ):
-    for _ in range(newspapers_count):
-        newspaper = create_newspaper()
-        if newspaper:
-            for _ in range(articles_count):
-                create_news_article(newspaper)
+    await run_in_db(seed_newspapers_articles, newspapers_count, articles_count)
 
     return {
         "msg": f"Succesfully created {newspapers_count} newspapers with {articles_count} articles"
     }
 
 
-def create_newspaper():
-    """Creates a fake newspaper entity."""
-    try:
-        newspaper = NewspaperEntity.create(
-            name=fake.company(),
-            email=fake.email(),
-        )
-        print(f"Created Newspaper: {newspaper.name} - {newspaper.email}")
-        return newspaper
-    except IntegrityError as e:
-        print(f"Error creating newspaper: {e}")
-        return None
-
-
-def create_news_article(newspaper):
-    """Creates a fake news article entity."""
-    try:
-        # Fake articles with a random date uploaded (past 180 days)
-        date_uploaded = fake.date_between(start_date="-183d", end_date="today")
-
-        article = NewsArticleEntity.create(
-            newspaper_id=newspaper.id,
-            title=fake.sentence(),
-            content=fake.paragraph(nb_sentences=50),
-            date_uploaded=date_uploaded,
-        )
-        print(f"Created Article: {article.title} - {article.date_uploaded}")
-        return article
-    except IntegrityError as e:
-        print(f"Error creating article: {e}")
-        return None
+@faker_router.post("/seed-jobs", response_model=SeedJob, status_code=202)
+async def start_seed_job(
+    background_tasks: BackgroundTasks,
+    newspapers_count: int = Query(..., ge=1, description="Number of newspapers to create"),
+    articles_count: int = Query(..., ge=0, description="Number of articles per newspaper"),
+    batch_size: int = Query(1000, ge=1, le=10000, description="Articles per INSERT"),
+    workers: int = Query(1, ge=1, le=32, description="Processes generating the fake content"),
+    seed: Optional[int] = Query(None, description="Seed for reproducible datasets"),
+):
+    job = create_seed_job(newspapers_count, articles_count)
+
+    # Runs after the response is sent, the job status can be polled meanwhile
+    background_tasks.add_task(run_seed_job, job, batch_size=batch_size, workers=workers, seed=seed)
+
+    return job
+
+
+@faker_router.get("/seed-jobs/{job_id}", response_model=SeedJob)
+async def get_seed_job_status(job_id: str):
+    job = get_seed_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Seed job not found")
+    return job
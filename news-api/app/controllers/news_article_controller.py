@@ -0,0 +1,162 @@
+import asyncio
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+from pydantic import ValidationError
+
+from app.controllers.base_controller import MAX_PAGE_SIZE, BaseController, encode_rows
+from app.entities.news_article_entity import NewsArticleEntity
+from app.executor import run_in_db
+from app.models.ingest_result import IngestResult
+from app.models.news_article import NewsArticle, NewsArticleInput
+from app.services.article_search_repository import parse_terms
+from app.services.news_article_service import get_news_article_service
+
+INGEST_BATCH_SIZE = 1000  # Lines written per insert
+MAX_LINE_SIZE = 1024 * 1024  # Bytes, longer lines are rejected
+MAX_REPORTED_ERRORS = 100
+DEFAULT_SEARCH_LIMIT = 20
+
+
+class NewsArticleController(BaseController):
+    def __init__(self):
+        BaseController.__init__(
+            self, NewsArticle, NewsArticleEntity, get_news_article_service()
+        )
+        self.router.add_api_route(
+            "/ingest",
+            self.ingest,
+            methods=["POST"],
+            response_model=IngestResult,
+            openapi_extra={
+                "requestBody": {"content": {"application/x-ndjson": {"schema": {"type": "string"}}}}
+            },
+        )
+        self.router.add_api_route("/search", self.search, methods=["GET"])
+
+    async def search(
+        self,
+        q: str = Query(..., min_length=1, description="Words the articles must contain"),
+        newspaper_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        after: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+        limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        """Articles matching every word of `q`, best match first. The
+        content is left out, fetch it with GET /news-articles/{id}."""
+        terms = parse_terms(q)
+        if not terms:
+            raise HTTPException(status_code=400, detail="The query has no words to search")
+
+        cursor = None
+        if after:
+            try:
+                score, id = after.split(",")
+                cursor = (float(score), int(id))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        rows = await run_in_db(
+            self.service.search, terms, newspaper_id, start_date, end_date, cursor, limit
+        )
+
+        headers = {}
+        if len(rows) == limit:
+            headers["X-Next-Cursor"] = f"{rows[-1]['score']!r},{rows[-1]['id']}"
+        return Response(encode_rows(rows), media_type="application/json", headers=headers)
+
+    async def ingest(self, request: Request):
+        """Creates one article per line of an NDJSON body, read as a stream.
+
+        A batch is written while the next one is read; reading waits for the
+        write when both are full, which slows the upload down to the speed
+        of the database instead of buffering it.
+        """
+        result = {"accepted": 0, "rejected": 0, "errors": []}
+        batch, line_numbers = [], []
+        pending = None
+
+        def reject(line_number, detail):
+            result["rejected"] += 1
+            if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                result["errors"].append({"line": line_number, "detail": detail})
+
+        async def write(batch, line_numbers):
+            written = await run_in_db(self.service.bulk_create, batch)
+            result["accepted"] += written["succeeded"]
+            for error in written["errors"]:
+                reject(line_numbers[error["index"]], error["detail"])
+
+        async for line_number, line in iter_lines(request.stream()):
+            if line is None:
+                reject(line_number, f"Line longer than {MAX_LINE_SIZE} bytes")
+                continue
+            if not line.strip():
+                continue
+
+            try:
+                article = NewsArticleInput.model_validate_json(line)
+            except ValidationError as e:
+                reject(line_number, format_validation_error(e))
+                continue
+
+            batch.append(article.model_dump(exclude_none=True))
+            line_numbers.append(line_number)
+            if len(batch) >= INGEST_BATCH_SIZE:
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(write(batch, line_numbers))
+                batch, line_numbers = [], []
+
+        if pending is not None:
+            await pending
+        if batch:
+            await write(batch, line_numbers)
+
+        result["errors"].sort(key=lambda error: error["line"])
+        return result
+
+
+async def iter_lines(chunks):
+    """Yields (line number, line) from a stream of bytes. Lines longer than
+    MAX_LINE_SIZE are yielded as None, without being kept in memory."""
+    buffer = b""
+    line_number = 0
+    skipping = False  # Inside a line too long to be kept
+
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            line_number += 1
+            yield line_number, line if len(line) <= MAX_LINE_SIZE else None
+
+        if skipping:
+            buffer = b""
+        elif len(buffer) > MAX_LINE_SIZE:
+            line_number += 1
+            skipping = True
+            buffer = b""
+            yield line_number, None
+
+    if buffer and not skipping:
+        yield line_number + 1, buffer
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'line'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+controller = NewsArticleController()
+
+
+def get_news_article_controller() -> NewsArticleController:
+    return controller
@@ -8,13 +8,13 @@ from app.entities.news_article_entity import NewsArticleEntity
 from app.entities.newspaper_entity import NewspaperEntity
 from app.models.articles_by_day_report import ArticlesByDayReport
 from app.models.newspaper import Newspaper
-from app.services.base_service import BaseService
+from app.services.newspaper_service import get_newspaper_service
 
 
 class NewspaperController(BaseController):
     def __init__(self):
         BaseController.__init__(
-            self, Newspaper, NewspaperEntity, BaseService(NewspaperEntity)
+            self, Newspaper, NewspaperEntity, get_newspaper_service()
         )
 
 
@@ -1,108 +1,88 @@
-from statistics import mean, stdev
-from fastapi import APIRouter, HTTPException
-from peewee import fn
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import date, timedelta
 
+from app.cache import article_tags, cached
+from app.controllers.base_controller import encode_row
 from app.controllers.newspaper_controller import get_newspaper_controller
-from app.entities.news_article_entity import NewsArticleEntity
 from app.entities.newspaper_entity import NewspaperEntity
+from app.executor import run_in_db, run_in_replica
+from app.instrumentation import TimedRoute
 from app.models.articles_by_day_report import ArticlesByDayReport
+from app.services.news_article_service import get_news_article_service
+from app.scheduler import get_scheduler
+from app.services.verification_repository import VerificationRepository
+from app.services.verification_service import (
+    get_same_weekday_dates,
+    get_verification_counts,
+    iter_verdicts,
+    verify_newspaper,
+)
 
-report_router = APIRouter()
+report_router = APIRouter(route_class=TimedRoute)
 
 
 def get_report_router():
     return report_router
 
 
+@report_router.get("/verify-articles")
+async def verify_all_articles(
+    newspaper_ids: Optional[List[int]] = Query(None, description="Newspapers to verify, all of them by default"),
+):
+    today = date.today()
+    # Not cached, the verdicts are computed while they are streamed. The
+    # baselines computed along are: they are read from the shards, not their
+    # replicas, whose lag would outlive the invalidations of the writes
+    rows, version = await run_in_db(get_verification_counts, today, newspaper_ids)
+
+    # One verdict per line
+    return StreamingResponse(
+        (encode_row(verdict) + b"\n" for verdict in iter_verdicts(today, rows, version)),
+        media_type="application/x-ndjson",
+    )
+
+
 @report_router.get("/verify-articles/{newspaper_id}")
 async def verify_articles(newspaper_id: int):
     today = date.today()
-    weekday = today.weekday()
-
-    # Calculate the date 6 months ago
-    six_months_ago = today - timedelta(days=6 * 30)  # Approximation of 6 months
 
     # Verify if the newspaper with the given ID exists
     newspaper = await get_newspaper_controller().get_by_id(newspaper_id)
     if not newspaper:
         raise HTTPException(status_code=404, detail="Newspaper not found")
 
-    # Query articles uploaded on the same day of the week, excluding today, over the last 6 months
-    articles_query = NewsArticleEntity.select(
-        fn.COUNT(NewsArticleEntity.id).alias("count"),
-        fn.WEEKDAY(NewsArticleEntity.date_uploaded).alias("weekday"),
-        NewsArticleEntity.date_uploaded,
-    ).where(
-        (NewsArticleEntity.newspaper_id == newspaper_id)
-        & (NewsArticleEntity.date_uploaded >= six_months_ago)
-        & (NewsArticleEntity.date_uploaded < today)
-        & (fn.WEEKDAY(NewsArticleEntity.date_uploaded) == weekday)
+    # Cached values are computed on the shards, not their replicas: one read
+    # from a lagging replica would be served after the write invalidated it
+    verdict = await cached(
+        f"verify-articles:{newspaper_id}:{today}",
+        article_tags(newspaper_id, get_same_weekday_dates(today) + [today]),
+        lambda: run_in_db(verify_newspaper, today, newspaper_id),
     )
 
-    # Collect the article counts from the query
-    articles_count = [row.count for row in list(articles_query)]
+    if verdict["status"] == "no_data":
+        raise HTTPException(status_code=404, detail=verdict["message"])
 
-    if not articles_count:
-        raise HTTPException(status_code=404, detail="No data found for this newspaper")
+    return {"message": verdict["message"]}
 
-    # Phase 1: Calculate the average and threshold (80% of average)
-    avg_articles = mean(articles_count)
-    threshold = avg_articles * 0.8  # 80% threshold
 
-    # Query to count today's articles
-    today_count_query = NewsArticleEntity.select(
-        fn.COUNT(NewsArticleEntity.id).alias("count")
-    ).where(
-        (NewsArticleEntity.newspaper_id == newspaper_id)
-        & (NewsArticleEntity.date_uploaded == today)
-    )
-    today_count = today_count_query.scalar()
-
-    # Check if today's count is below the threshold
-    if today_count < threshold:
-        # Phase 2: Calculate the Coefficient of Variation (CV)
-        if len(articles_count) > 1:  # stdev requires at least 2 values
-            std_dev = stdev(articles_count)
-            cv = std_dev / avg_articles
-        else:
-            cv = 0
-
-        # If CV is high, calculate interquartile range (IQR)
-        if cv > 0.5:  # Arbitrary threshold for high variability
-            sorted_articles = sorted(articles_count)
-            q1 = sorted_articles[len(sorted_articles) // 4]
-            q3 = sorted_articles[(len(sorted_articles) * 3) // 4]
-            iqr = q3 - q1
-
-            # Check if today's count is below Q1
-            if today_count < q1:
-                return {
-                    "message": f"Today's article count is below the first quartile (Q1={q1})."
-                }
-            else:
-                return {
-                    "message": f"Today's article count is within acceptable interquartile range (IQR={iqr})."
-                }
-
-        # Phase 3: If CV is low, check frequency distribution
-        else:
-            freq_dist = {x: articles_count.count(x) for x in set(articles_count)}
-            most_frequent_count = max(freq_dist, key=freq_dist.get)
-
-            # Check if today's count is within the most frequent category
-            if today_count == most_frequent_count:
-                return {
-                    "message": f"Today's article count matches the most frequent count ({most_frequent_count})."
-                }
-            else:
-                return {
-                    "message": f"Today's article count ({today_count}) does not match the most frequent count ({most_frequent_count})."
-                }
-    else:
-        return {
-            "message": f"Today's article count ({today_count}) is above the 80% threshold ({threshold:.2f})."
-        }
+@report_router.get("/verifications")
+async def get_verifications(
+    day: Optional[date] = Query(None, description="Day of the verification, the last one by default"),
+    newspaper_id: Optional[int] = None,
+):
+    """Verdicts stored by the scheduled verification."""
+    return await run_in_replica(VerificationRepository().get_by_day, day, newspaper_id)
+
+
+@report_router.post("/verifications")
+async def run_verifications():
+    """Runs the scheduled verification now. The alerts are sent in the
+    background, the response doesn't wait for them."""
+    today = date.today()
+    alerts = await get_scheduler().run_once(today)
+    return {"day": today, "alerts": alerts}
 
 
 @report_router.get(
@@ -118,29 +98,26 @@ async def report_articles_by_day(newspaper_id: int):
     start_date = last_monday - timedelta(days=7)
 
     # Verify if the newspaper with the given ID exists
-    newspaper = get_newspaper_controller().get_by_id(newspaper_id)
+    newspaper = await get_newspaper_controller().get_by_id(newspaper_id)
+    if not newspaper:
+        raise HTTPException(status_code=404, detail="Newspaper not found")
 
     # Generate a list of dates starting from the previous Monday (7 days range)
     date_range = [start_date + timedelta(days=i) for i in range(7)]
 
-    # Query to count articles grouped by date_uploaded, filtering by newspaper_id
-    query = (
-        NewsArticleEntity.select(
-            NewsArticleEntity.date_uploaded,
-            fn.COUNT(NewsArticleEntity.id).alias("count"),
-        )
-        .where(
-            (NewsArticleEntity.newspaper_id == newspaper_id)
-            & (NewsArticleEntity.date_uploaded >= start_date)
-            & (NewsArticleEntity.date_uploaded < last_monday)
-        )
-        .group_by(NewsArticleEntity.date_uploaded)
-        .order_by(NewsArticleEntity.date_uploaded)
+    # Daily counts from the rollup table. Last week doesn't change anymore,
+    # unless articles are backdated, which invalidates the cached counts
+    articles_by_day = await cached(
+        f"report-articles-by-day:{newspaper_id}:{start_date}",
+        article_tags(newspaper_id, date_range),
+        lambda: run_in_db(
+            get_news_article_service().get_counts_between,
+            newspaper_id,
+            start_date,
+            last_monday,
+        ),
     )
 
-    # Fetch the data
-    articles_by_day = {row.date_uploaded: row.count for row in query}
-
     # Ensure each day in the last week is represented, even with 0 articles
     report = [
         ArticlesByDayReport(date=day, article_count=articles_by_day.get(day, 0))
@@ -148,3 +125,4 @@ async def report_articles_by_day(newspaper_id: int):
     ]
 
     return report
+
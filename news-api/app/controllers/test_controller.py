@@ -1,140 +1,149 @@
-from fastapi import APIRouter, HTTPException
-from peewee import fn
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
-from app.entities.news_article_entity import NewsArticleEntity
+import io
+import os
+from datetime import date
+from typing import List, Optional
 
-test_router = APIRouter()
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+from app.cache import article_tags, cached, newspapers_tags
+from app.executor import run_in_db
+from app.instrumentation import TimedRoute
+from app.services import statistics_service
+from app.services.regression_service import RegressionRegistry, get_regression_registry
 
+test_router = APIRouter(route_class=TimedRoute)
 
-@test_router.get("/test/central-tendency")
-async def test_central_tendency(newspaper_id: int):
-    # Fetching articles count for central tendency calculation
-    articles_query = (
-        NewsArticleEntity.select(fn.COUNT(NewsArticleEntity.id).alias("count"))
-        .where(NewsArticleEntity.newspaper_id == newspaper_id)
-        .group_by(NewsArticleEntity.date_uploaded)  # Group by date
-    )
+MAX_SIMULATIONS = 10_000  # Each one draws a count per day of the series
 
-    articles_count = [row.count for row in articles_query]
+# Directory of an export (python -m app.export) to compute the statistics
+# from, instead of the database
+TESTS_EXPORT_DIR = os.getenv("TESTS_EXPORT_DIR")
 
-    if not articles_count:
-        raise HTTPException(
-            status_code=404, detail="No articles found for this newspaper"
-        )
+export_registry = None
 
-    mean_calculated = float(np.mean(articles_count))  # Convert to float
-    expected_mean = 100  # Replace with your expected value
 
-    return {
-        "calculated_mean": mean_calculated,
-        "expected_mean": expected_mean,
-        "is_mean_correct": mean_calculated < (expected_mean * 0.8),  # Threshold of 80%
-    }
+def get_export_registry():
+    global export_registry
+    if export_registry is None:
+        from app.services.export_service import ExportedDataset
 
+        export_registry = RegressionRegistry(ExportedDataset(TESTS_EXPORT_DIR))
+    return export_registry
 
-@test_router.get("/test/dispersion")
-async def test_dispersion(newspaper_id: int):
-    # Fetching articles count for dispersion calculation
-    articles_query = (
-        NewsArticleEntity.select(fn.COUNT(NewsArticleEntity.id).alias("count"))
-        .where(NewsArticleEntity.newspaper_id == newspaper_id)
-        .group_by(NewsArticleEntity.date_uploaded)  # Group by date
-    )
 
-    articles_count = [row.count for row in articles_query]
+def get_registry():
+    return get_export_registry() if TESTS_EXPORT_DIR else get_regression_registry()
 
-    if not articles_count:
+
+async def get_model(newspaper_id: int):
+    # The daily series is read once and kept with the fitted model until
+    # the newspaper's articles change
+    model = await run_in_db(get_registry().get_model, newspaper_id)
+    if model is None:
         raise HTTPException(
             status_code=404, detail="No articles found for this newspaper"
         )
+    return model
 
-    std_dev_calculated = float(np.std(articles_count, ddof=1))  # Convert to float
-    expected_std_dev = 15  # Replace with your expected value
 
-    return {
-        "calculated_std_dev": std_dev_calculated,
-        "expected_std_dev": expected_std_dev,
-        "is_std_dev_correct": std_dev_calculated
-        < (expected_std_dev * 0.8),  # Threshold of 80%
-    }
+@test_router.get("/summary")
+async def test_summary(
+    newspaper_id: int,
+    simulations: int = Query(1000, ge=1, le=MAX_SIMULATIONS),
+    seed: Optional[int] = None,
+):
+    # All the tests below over a single read of the daily series
+    model = await get_model(newspaper_id)
+    return statistics_service.summarize(model, simulations, seed)
 
 
-@test_router.get("/test/regression")
-async def test_regression(newspaper_id: int):
-    # Fetching articles data for regression analysis
-    articles_query = (
-        NewsArticleEntity.select(
-            NewsArticleEntity.date_uploaded,
-            fn.COUNT(NewsArticleEntity.id).alias("count"),
-        )
-        .where(NewsArticleEntity.newspaper_id == newspaper_id)
-        .group_by(NewsArticleEntity.date_uploaded)
-        .order_by(NewsArticleEntity.date_uploaded)
-    )
-
-    dates = [row.date_uploaded.toordinal() for row in articles_query]
-    counts = [row.count for row in articles_query]
+@test_router.get("/test/central-tendency")
+async def test_central_tendency(newspaper_id: int):
+    model = await get_model(newspaper_id)
+    return statistics_service.central_tendency(statistics_service.get_counts(model))
 
-    if len(dates) < 2:  # Need at least 2 points for regression
-        raise HTTPException(status_code=404, detail="Not enough data for regression")
 
-    # Reshape the data for the regression model
-    dates = np.array(dates).reshape(-1, 1)
-    model = LinearRegression()
-    model.fit(dates, counts)
+@test_router.get("/test/dispersion")
+async def test_dispersion(newspaper_id: int):
+    model = await get_model(newspaper_id)
+    return statistics_service.dispersion(statistics_service.get_counts(model))
 
-    # Simulate using Monte Carlo method to get expected values
-    simulated_counts = np.random.normal(
-        loc=model.predict(dates), scale=np.std(counts), size=(1000,)
-    )
-    expected_value = float(np.mean(simulated_counts))  # Convert to float
-    calculated_average = float(np.mean(counts))  # Convert to float
 
-    return {
-        "expected_value": expected_value,
-        "calculated_average": calculated_average,
-        "is_average_matching": np.isclose(
-            expected_value, calculated_average, rtol=0.1
-        ).item(),  # Convert to boolean
-    }
+@test_router.get("/test/regression")
+async def test_regression(
+    newspaper_id: int,
+    simulations: int = Query(1000, ge=1, le=MAX_SIMULATIONS),
+    seed: Optional[int] = None,
+):
+    model = await run_in_db(get_registry().get_model, newspaper_id)
+    result = statistics_service.regression(model, simulations, seed) if model else None
+
+    if result is None:  # Need at least 2 points for regression
+        raise HTTPException(status_code=404, detail="Not enough data for regression")
+    return result
 
 
 @test_router.get("/test/canonical")
 async def test_canonical(newspaper_id: int):
-    # Fetching articles count for canonical analysis
-    articles_query = (
-        NewsArticleEntity.select(fn.COUNT(NewsArticleEntity.id).alias("count"))
-        .where(NewsArticleEntity.newspaper_id == newspaper_id)
-        .group_by(NewsArticleEntity.date_uploaded)  # Group by date
-    )
+    model = await get_model(newspaper_id)
+    return statistics_service.canonical(statistics_service.get_counts(model))
+
+
+@test_router.get("/newspapers")
+async def test_newspapers(
+    days: int = Query(statistics_service.WINDOW_DAYS, ge=2, le=3660),
+    newspaper_ids: Optional[List[int]] = Query(None, description="Newspapers to compare, all of them by default"),
+    format: str = Query("json", pattern="^(json|npy|arrow)$"),
+):
+    """Mean, standard deviation and trend of the daily article counts of many
+    newspapers, over the `days` days before today. `npy` and `arrow` return
+    the same columns as a NumPy structured array or an Arrow IPC stream."""
+    today = date.today()
+    window = statistics_service.get_window(today, days)
+    if TESTS_EXPORT_DIR:
+        # The export is already in memory, nothing to cache
+        columns = statistics_service.get_newspapers_statistics(
+            today, days, newspaper_ids, get_export_registry().daily_counts
+        )
+    else:
+        key = ",".join(str(id) for id in sorted(newspaper_ids)) if newspaper_ids else "*"
+        columns = await cached(
+            f"tests-newspapers:{key}:{days}:{today}",
+            article_tags(None, window) + newspapers_tags(),
+            lambda: run_in_db(statistics_service.get_newspapers_statistics, today, days, newspaper_ids),
+        )
 
-    articles_count = [row.count for row in articles_query]
+    if format == "npy":
+        return Response(encode_npy(columns), media_type="application/octet-stream")
+    if format == "arrow":
+        return Response(encode_arrow(columns), media_type="application/vnd.apache.arrow.stream")
 
-    if not articles_count:
-        raise HTTPException(
-            status_code=404, detail="No articles found for this newspaper"
-        )
+    return {
+        "start_date": window[0],
+        "end_date": window[-1],
+        **{name: column.tolist() for name, column in columns.items()},
+    }
 
-    # Assuming we have some expected count data
-    expected_count_data = np.array([50, 100, 150])  # Example expected counts
-    observed_count_data = np.array(articles_count)
 
-    # Perform Canonical Analysis (use dummy class labels)
-    lda = LinearDiscriminantAnalysis()
-    lda.fit(
-        observed_count_data.reshape(-1, 1), np.zeros_like(observed_count_data)
-    )  # Dummy classes
+def encode_npy(columns: dict) -> bytes:
+    import numpy as np
 
-    # Get probabilities for expected counts
-    probabilities = lda.predict_proba(expected_count_data.reshape(-1, 1))
+    buffer = io.BytesIO()
+    np.save(buffer, np.rec.fromarrays(list(columns.values()), names=list(columns)), allow_pickle=False)
+    return buffer.getvalue()
 
-    return {
-        "expected_count": expected_count_data.tolist(),
-        "observed_count": observed_count_data.tolist(),
-        "probabilities": probabilities.tolist(),
-    }
+
+def encode_arrow(columns: dict) -> bytes:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="The arrow format needs pyarrow to be installed")
+
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 
 def get_test_router():
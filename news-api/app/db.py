@@ -1,15 +1,314 @@
-from peewee import Model, MySQLDatabase
-
-db = MySQLDatabase(
-    "newspapers",
-    user="root",
-    password="",
-    host="localhost",
-    port=3306,
+import os
+import time
+import zlib
+from bisect import bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from peewee import DatabaseProxy, MySQLDatabase
+from playhouse.pool import PooledMySQLDatabase, PooledSqliteDatabase
+
+from app.instrumentation import record_query
+
+# Database settings, overridable through environment variables
+DB_ENGINE = os.getenv("DB_ENGINE", "mysql")  # "mysql" or "sqlite"
+DB_NAME = os.getenv("DB_NAME", "newspapers")
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+
+# Connection pool settings
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+DB_STALE_TIMEOUT = int(os.getenv("DB_STALE_TIMEOUT", "300"))  # Seconds
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+DB_HEALTH_CHECK = os.getenv("DB_HEALTH_CHECK", "1") == "1"
+
+# Sharding settings. Shards and replicas are comma separated database names
+# (file names with SQLite), as "host[:port]/name" for MySQL servers other
+# than DB_HOST
+DB_SHARDS = os.getenv("DB_SHARDS", "")  # Empty for a single database, DB_NAME
+DB_REPLICAS = os.getenv("DB_REPLICAS", "")  # Replica of each shard, in the same order, empty for none
+DB_SHARD_STRATEGY = os.getenv("DB_SHARD_STRATEGY", "hash")  # "hash" or "range" of newspaper_id
+DB_SHARD_RANGES = os.getenv("DB_SHARD_RANGES", "")  # First newspaper_id of every shard but the first
+
+
+class HealthCheckMixin:
+    """Checks pooled connections are still alive before handing them out
+    (a ping on MySQL), unless DB_HEALTH_CHECK is disabled."""
+
+    def _is_closed(self, conn):
+        if not DB_HEALTH_CHECK:
+            return False
+        return super()._is_closed(conn)
+
+
+class InstrumentedMixin:
+    """Adds the time of every query to the request that issued it."""
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params, *args, **kwargs)
+        finally:
+            record_query(time.perf_counter() - start)
+
+
+class InterleavedIdsMixin:
+    """With several shards, makes MySQL generate the ids of shard k in
+    k + 1, k + 1 + n, k + 1 + 2n..., so the shard of a row is known from its
+    id alone."""
+
+    shard_index = 0
+    shards_count = 1
+
+    def _initialize_connection(self, conn):
+        super()._initialize_connection(conn)
+        if self.shards_count > 1:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SET SESSION auto_increment_increment = %s, auto_increment_offset = %s",
+                (self.shards_count, self.shard_index + 1),
+            )
+            cursor.close()
+
+
+class NewsMySQLDatabase(InstrumentedMixin, HealthCheckMixin, InterleavedIdsMixin, PooledMySQLDatabase):
+    pass
+
+
+class NewsSqliteDatabase(InstrumentedMixin, HealthCheckMixin, PooledSqliteDatabase):
+    pass
+
+
+def create_db(location: str = DB_NAME):
+    pool_options = {
+        "max_connections": DB_MAX_CONNECTIONS,
+        "stale_timeout": DB_STALE_TIMEOUT,
+        "timeout": DB_POOL_TIMEOUT,
+    }
+
+    if DB_ENGINE == "sqlite":
+        # Local mode, e.g. for load testing without a MySQL server
+        return NewsSqliteDatabase(
+            location if location.endswith(".db") else f"{location}.db",
+            pragmas={"journal_mode": "wal", "synchronous": "normal", "foreign_keys": 1},
+            check_same_thread=False,
+            **pool_options,
+        )
+
+    if DB_ENGINE == "mysql":
+        host, port, name = DB_HOST, DB_PORT, location
+        if "/" in location:
+            address, name = location.rsplit("/", 1)
+            host, _, port = address.partition(":")
+            port = int(port or DB_PORT)
+        return NewsMySQLDatabase(
+            name,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            host=host,
+            port=port,
+            **pool_options,
+        )
+
+    raise ValueError(f"Unsupported DB_ENGINE: {DB_ENGINE}")
+
+
+class ShardMap:
+    """Places each newspaper, with its articles and daily counts, on a shard.
+
+    "hash" spreads the newspapers evenly, "range" keeps consecutive ids
+    together: `bounds` holds the first newspaper_id of every shard but the
+    first. Article ids are interleaved between the shards (see
+    InterleavedIdsMixin), which gives the shard of an article from its id.
+    """
+
+    def __init__(self, count: int, strategy: str = "hash", bounds: Optional[List[int]] = None):
+        if strategy not in ("hash", "range"):
+            raise ValueError(f"Unsupported DB_SHARD_STRATEGY: {strategy}")
+        bounds = bounds or []
+        if strategy == "range" and count > 1 and (len(bounds) != count - 1 or bounds != sorted(bounds)):
+            raise ValueError(f"DB_SHARD_RANGES needs {count - 1} increasing newspaper ids")
+        self.count = count
+        self.strategy = strategy
+        self.bounds = bounds
+
+    def shard_for(self, newspaper_id: int) -> int:
+        if self.count == 1:
+            return 0
+        if self.strategy == "range":
+            return bisect_right(self.bounds, newspaper_id)
+        return zlib.crc32(int(newspaper_id).to_bytes(8, "little", signed=True)) % self.count
+
+    def shard_of_id(self, id: int) -> int:
+        return (id - 1) % self.count
+
+
+def split_locations(value: str) -> List[str]:
+    return [location.strip() for location in value.split(",")] if value.strip() else []
+
+
+def create_shards():
+    shards = [create_db(location) for location in split_locations(DB_SHARDS) or [DB_NAME]]
+    replicas = [create_db(location) if location else None for location in split_locations(DB_REPLICAS)]
+    replicas += [None] * (len(shards) - len(replicas))
+    for index, database in enumerate(shards):
+        database.shard_index = index
+        database.shards_count = len(shards)
+    return shards, replicas[: len(shards)]
+
+
+shards, replicas = create_shards()
+shard_map = ShardMap(
+    len(shards), DB_SHARD_STRATEGY, [int(bound) for bound in split_locations(DB_SHARD_RANGES)]
 )
 
+# Database of the running block, set by use_shard
+current_database: ContextVar = ContextVar("current_database", default=None)
+prefer_replicas: ContextVar = ContextVar("prefer_replicas", default=False)
+
+
+class RoutedDatabase(DatabaseProxy):
+    """The database the entities are bound to. Queries go to the shard
+    selected with use_shard, the first one by default, or to its replica
+    within use_replicas."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        pass
+
+    def attach_callback(self, callback):
+        # Never initialized, the callbacks would never run
+        return callback
+
+    @property
+    def obj(self):
+        return current_database.get() or get_shard_database(0)
+
+    # Transactions and connection blocks stay on the database they started on
+    def atomic(self, *args, **kwargs):
+        return self.obj.atomic(*args, **kwargs)
+
+    def transaction(self, *args, **kwargs):
+        return self.obj.transaction(*args, **kwargs)
+
+    def savepoint(self):
+        return self.obj.savepoint()
+
+    def manual_commit(self):
+        return self.obj.manual_commit()
+
+    def connection_context(self):
+        return self.obj.connection_context()
+
+
+def get_shard_database(index: int):
+    replica = replicas[index] if prefer_replicas.get() else None
+    return replica or shards[index]
+
+
+@contextmanager
+def connected(database):
+    """Opens a connection to `database` for the block, unless the thread
+    already has one, which is then left open."""
+    opened = database.is_closed()
+    if opened:
+        database.connect()
+    try:
+        yield database
+    finally:
+        if opened:
+            database.close()
+
+
+@contextmanager
+def releasing_connections():
+    """Returns to the pool the connections the queries of the block opened,
+    on whichever shards and replicas they went to."""
+    closed = [database for database in get_databases() if database.is_closed()]
+    try:
+        yield
+    finally:
+        for database in closed:
+            if not database.is_closed():
+                database.close()
+
+
+@contextmanager
+def use_shard(index: int):
+    """Sends the queries of the block to a shard, or to its replica within
+    use_replicas."""
+    database = get_shard_database(index)
+    token = current_database.set(database)
+    try:
+        with connected(database):
+            yield database
+    finally:
+        current_database.reset(token)
+
+
+def use_newspaper_shard(newspaper_id: int):
+    return use_shard(shard_map.shard_for(newspaper_id))
+
+
+@contextmanager
+def use_replicas():
+    """Sends the reads of the block to the replicas of the shards that have
+    one. Replicas lag behind, only reports should read from them."""
+    token = prefer_replicas.set(True)
+    try:
+        yield
+    finally:
+        prefer_replicas.reset(token)
+
+
+def scatter(fn, *args, **kwargs) -> list:
+    """Runs `fn` on every shard and returns its results, in shard order. The
+    shards are queried one after the other, from the calling thread, so a
+    job never holds more than one connection per shard."""
+    results = []
+    for index in range(shard_map.count):
+        with use_shard(index):
+            results.append(fn(*args, **kwargs))
+    return results
+
+
+def is_mysql(database) -> bool:
+    if isinstance(database, RoutedDatabase):
+        database = database.obj
+    return isinstance(database, MySQLDatabase)
+
+
+def check_databases():
+    """Runs a trivial query on every shard and replica."""
+    for database in get_databases():
+        with connected(database):
+            database.execute_sql("SELECT 1")
+
+
+def close_all():
+    for database in get_databases():
+        database.close_all()
+
+
+def get_databases():
+    return shards + [replica for replica in replicas if replica is not None]
+
+
+def get_shards():
+    return shards
+
+
+def get_shard_map() -> ShardMap:
+    return shard_map
+
+
+db = RoutedDatabase()
+
 
 def get_db():
-    if db.is_closed():
-        db.connect()
+    # Connections are opened per request and returned to the pool afterwards
     return db
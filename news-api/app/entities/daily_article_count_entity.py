@@ -0,0 +1,27 @@
+from peewee import CompositeKey, DateField, ForeignKeyField, IntegerField, Model
+
+from app.db import get_db
+from app.entities.newspaper_entity import NewspaperEntity
+
+
+class DailyArticleCountEntity(Model):
+    """Number of articles uploaded by a newspaper each day, kept up to date
+    by NewsArticleService so reports don't have to count the articles."""
+
+    newspaper_id = ForeignKeyField(
+        NewspaperEntity,
+        column_name="newspaper_id",
+        on_delete="CASCADE",
+        index=False,
+        lazy_load=False,
+    )
+    day = DateField()
+    count = IntegerField(default=0)
+    # Bumped by every change of the count, rows are never deleted outside a
+    # rebuild: a series changed if the sum or max of its versions did
+    version = IntegerField(default=0)
+
+    class Meta:
+        database = get_db()
+        table_name = "daily_article_counts"
+        primary_key = CompositeKey("newspaper_id", "day")
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from peewee import CharField, DateTimeField, Model
+
+from app.db import get_db
+
+
+class MigrationEntity(Model):
+    name = CharField(max_length=255, primary_key=True)
+    applied_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = get_db()
+        table_name = "schema_migrations"
@@ -0,0 +1,22 @@
+from peewee import BlobField, ForeignKeyField, Model
+
+from app.db import get_db
+from app.entities.news_article_entity import NewsArticleEntity
+
+
+class NewsArticleContentEntity(Model):
+    """Body of an article, zlib-compressed. Kept out of news_articles so
+    listings and aggregates don't read the bodies along with the rows."""
+
+    article_id = ForeignKeyField(
+        NewsArticleEntity,
+        column_name="article_id",
+        primary_key=True,
+        on_delete="CASCADE",
+        lazy_load=False,
+    )
+    body = BlobField()
+
+    class Meta:
+        database = get_db()
+        table_name = "news_article_contents"
@@ -1,17 +1,36 @@
 from datetime import date
 
-from peewee import AutoField, CharField, DateField, IntegerField, Model, TextField
+from peewee import (
+    AutoField,
+    CharField,
+    DateField,
+    ForeignKeyField,
+    Model,
+)
 
 from app.db import get_db
+from app.entities.newspaper_entity import NewspaperEntity
 
 
 class NewsArticleEntity(Model):
     id = AutoField()
-    newspaper_id = IntegerField()
+    # Indexed by the composite index below, which starts with this column
+    newspaper_id = ForeignKeyField(
+        NewspaperEntity,
+        column_name="newspaper_id",
+        backref="articles",
+        on_delete="CASCADE",
+        index=False,
+        lazy_load=False,
+    )
     title = CharField(max_length=255)
-    content = TextField()
+    # The body is stored in news_article_contents
     date_uploaded = DateField(default=date.today)
 
     class Meta:
         database = get_db()
         table_name = "news_articles"
+        indexes = (
+            # Reports filter by newspaper and a date range, then group by date
+            (("newspaper_id", "date_uploaded"), False),
+        )
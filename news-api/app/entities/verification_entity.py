@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from peewee import (
+    CharField,
+    DateField,
+    DateTimeField,
+    FloatField,
+    ForeignKeyField,
+    IntegerField,
+    Model,
+    TextField,
+)
+
+from app.db import get_db
+from app.entities.newspaper_entity import NewspaperEntity
+
+
+class VerificationEntity(Model):
+    """Verdict of the scheduled verification of a newspaper's article count,
+    one per newspaper and day."""
+
+    newspaper_id = ForeignKeyField(
+        NewspaperEntity,
+        column_name="newspaper_id",
+        on_delete="CASCADE",
+        index=False,
+        lazy_load=False,
+    )
+    day = DateField()
+    status = CharField(max_length=32)
+    today_count = IntegerField()
+    threshold = FloatField(null=True)  # None without history
+    message = TextField()
+    verified_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = get_db()
+        table_name = "verifications"
+        indexes = (
+            # A new run of the same day replaces the verdicts
+            (("newspaper_id", "day"), True),
+            (("day",), False),
+        )
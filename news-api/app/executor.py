@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import DB_MAX_CONNECTIONS, releasing_connections, use_replicas
+
+# One worker per pooled connection, so jobs never wait on the pool itself
+DB_EXECUTOR_WORKERS = min(
+    int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_MAX_CONNECTIONS))), DB_MAX_CONNECTIONS
+)
+
+
+class DbExecutor:
+    """Bounded thread pool running the blocking peewee work of the endpoints.
+
+    A job connects to the shards its queries go to, when they first do, and
+    the connections go back to the pool as soon as the job finishes.
+    `queued` is the number of jobs waiting for a free worker: when it keeps
+    growing, the pool is saturated.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db-worker"
+        )
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+
+    async def run(self, fn, *args, **kwargs):
+        with self.lock:
+            self.queued += 1
+
+        # Keep the caller's context variables visible to the job
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, context.run, self.run_job, fn, args, kwargs
+        )
+
+    def run_job(self, fn, args, kwargs):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+
+        try:
+            with releasing_connections():
+                return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+db_executor = DbExecutor(DB_EXECUTOR_WORKERS)
+
+
+async def run_in_db(fn, *args, **kwargs):
+    return await db_executor.run(fn, *args, **kwargs)
+
+
+async def run_in_replica(fn, *args, **kwargs):
+    """Runs a read-only job on the read replicas, for the shards having one."""
+    with use_replicas():
+        return await db_executor.run(fn, *args, **kwargs)
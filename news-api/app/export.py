@@ -0,0 +1,27 @@
+import argparse
+import time
+
+from app.db import get_db
+from app.services.export_service import EXPORT_CHUNK_SIZE, export_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the articles and daily counts to Arrow files")
+    parser.add_argument("--output", default="exports", help="Directory of the export")
+    parser.add_argument("--full", action="store_true", help="Export every article again, not only the new ones")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows per record batch")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(exported):
+        elapsed = time.perf_counter() - start
+        print(f"{exported} articles ({exported / elapsed:.0f} articles/s)")
+
+    with get_db().connection_context():
+        manifest = export_articles(args.output, full=args.full, chunk_size=args.chunk_size, progress=progress)
+    print(f"Exported up to article {manifest['high_water_mark']} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import contextvars
+import cProfile
+import heapq
+import os
+import random
+import re
+import threading
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0 disables profiling
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "10"))  # Slowest profiles kept on disk
+
+# Upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestTimings:
+    """Time spent by one request. Shared with the database executor jobs of
+    the request through the context variable below."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.db_time = 0.0
+        self.queries = 0
+        self.endpoint_time = 0.0
+        self.handler_time = 0.0
+
+    def add_query(self, elapsed: float):
+        with self.lock:
+            self.db_time += elapsed
+            self.queries += 1
+
+    @property
+    def serialization_time(self):
+        # Validation of the endpoint's result and rendering of the response
+        return max(self.handler_time - self.endpoint_time, 0.0)
+
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def record_query(elapsed: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add_query(elapsed)
+
+
+class TimedRoute(APIRoute):
+    """Route measuring its endpoint apart from the validation and
+    serialization FastAPI does around it."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request):
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings = current_timings.get()
+                if timings is not None:
+                    timings.handler_time = time.perf_counter() - start
+
+        return timed_handler
+
+
+def timed_endpoint(endpoint):
+    # include_router rebuilds the routes from their already timed endpoint
+    if getattr(endpoint, "is_timed", False):
+        return endpoint
+
+    def record(start):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.endpoint_time = time.perf_counter() - start
+
+    if iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                record(start)
+
+    else:
+
+        @wraps(endpoint)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                record(start)
+
+    timed.is_timed = True
+    return timed
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (method, route, status) -> count
+        self.totals = {}  # (method, route) -> [requests, wall, db, queries, serialization]
+        self.buckets = {}  # (method, route) -> count per duration bucket
+
+    def record(self, method: str, route: str, status: int, wall: float, timings: RequestTimings):
+        key = (method, route)
+        with self.lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+
+            totals = self.totals.setdefault(key, [0, 0.0, 0.0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += timings.db_time
+            totals[3] += timings.queries
+            totals[4] += timings.serialization_time
+
+            buckets = self.buckets.setdefault(key, [0] * len(DURATION_BUCKETS))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if wall <= bound:
+                    buckets[index] += 1
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            lines += [
+                "# HELP http_requests_total Requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{{labels(method, route)},status="{status}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Wall time of the requests.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), buckets in sorted(self.buckets.items()):
+                totals = self.totals[(method, route)]
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{{labels(method, route)},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels(method, route)},le="+Inf"}} {totals[0]}'
+                )
+                lines.append(f"http_request_duration_seconds_sum{{{labels(method, route)}}} {totals[1]}")
+                lines.append(f"http_request_duration_seconds_count{{{labels(method, route)}}} {totals[0]}")
+
+            for name, index, kind, help in (
+                ("http_request_db_seconds_total", 2, "counter", "Time spent executing SQL."),
+                ("http_request_db_queries_total", 3, "counter", "SQL queries issued."),
+                ("http_request_serialization_seconds_total", 4, "counter", "Time spent validating and serializing responses."),
+            ):
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for (method, route), totals in sorted(self.totals.items()):
+                    lines.append(f"{name}{{{labels(method, route)}}} {totals[index]}")
+
+        return lines
+
+
+def labels(method: str, route: str):
+    return f'method="{method}",route="{route}"'
+
+
+route_metrics = RouteMetrics()
+
+
+class SlowRequestProfiler:
+    """Profiles a sample of the requests and keeps the dumps of the slowest
+    ones. cProfile only sees the event loop thread, so the time spent in the
+    database executor shows up as waiting."""
+
+    def __init__(self, sample_rate: float, directory: str, keep: int):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.active = False  # A single profiler can run on a thread at a time
+        self.slowest = []  # Heap of (wall, path)
+
+    def start(self):
+        with self.lock:
+            if self.active or random.random() >= self.sample_rate:
+                return None
+            self.active = True
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, route: str, wall: float):
+        profiler.disable()
+        with self.lock:
+            self.active = False
+            if len(self.slowest) >= self.keep and wall <= self.slowest[0][0]:
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            name = re.sub(r"[^\w]+", "_", route).strip("_") or "root"
+            path = os.path.join(self.directory, f"{int(wall * 1000)}ms_{name}_{time.time_ns()}.prof")
+            profiler.dump_stats(path)
+
+            heapq.heappush(self.slowest, (wall, path))
+            if len(self.slowest) > self.keep:
+                _, evicted = heapq.heappop(self.slowest)
+                os.remove(evicted)
+
+
+profiler = SlowRequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_KEEP)
+
+
+async def instrumentation_middleware(request: Request, call_next):
+    timings = RequestTimings()
+    current_timings.set(timings)
+    request_profiler = profiler.start() if PROFILE_SAMPLE_RATE > 0 else None
+
+    start = time.perf_counter()
+    response = await call_next(request)
+    wall = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+
+    if request_profiler is not None:
+        profiler.stop(request_profiler, route_path, wall)
+
+    route_metrics.record(request.method, route_path, response.status_code, wall, timings)
+    response.headers["Server-Timing"] = (
+        f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries", '
+        f"serialize;dur={timings.serialization_time * 1000:.2f}, "
+        f"total;dur={wall * 1000:.2f}"
+    )
+    return response
@@ -1,12 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.db import get_db
-from app.entities.news_article_entity import NewsArticleEntity
-from app.entities.newspaper_entity import NewspaperEntity
+from app.cache import get_cache
+from app.db import check_databases, close_all
+from app.executor import db_executor, run_in_db
+from app.instrumentation import instrumentation_middleware, route_metrics
+from app.migrations import run_migrations
+from app.notifications import get_notifier
 from app.routes.routes import router
-
-db = get_db()
+from app.scheduler import get_scheduler
 
 # Create the FastAPI app
 app = FastAPI(
@@ -24,6 +27,41 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Wall, SQL and serialization time per route, see /metrics
+app.middleware("http")(instrumentation_middleware)
+
+
+@app.get("/health", tags=["Health"])
+async def health():
+    await run_in_db(check_databases)
+    return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    lines = route_metrics.render()
+
+    # A growing "queued" means requests wait for a database worker
+    lines += ["# TYPE db_executor gauge"]
+    for name, value in db_executor.stats().items():
+        lines.append(f'db_executor{{stat="{name}"}} {value}')
+
+    lines += ["# TYPE cache gauge"]
+    for name, value in get_cache().stats().items():
+        lines.append(f'cache{{stat="{name}"}} {value}')
+
+    # "dropped" and "failed" alerts were never delivered
+    lines += ["# TYPE notifier gauge"]
+    for name, value in get_notifier().stats().items():
+        lines.append(f'notifier{{stat="{name}"}} {value}')
+
+    lines += ["# TYPE verification gauge"]
+    for name, value in get_scheduler().stats().items():
+        lines.append(f'verification{{stat="{name}"}} {value}')
+
+    return "\n".join(lines) + "\n"
+
+
 # Include the API router with all routes from newspapers and news articles
 app.include_router(router)
 
@@ -31,16 +69,19 @@ app.include_router(router)
 # Optional: You can add startup and shutdown events here if needed
 @app.on_event("startup")
 async def startup_event():
-    print("Creating tables...")
-    with db:
-        db.create_tables([NewspaperEntity, NewsArticleEntity])
+    print("Running migrations...")
+    run_migrations()
+    get_notifier().start()
+    get_scheduler().start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    print("Closing database connection...")
-    if not db.is_closed():
-        db.close()
+    await get_scheduler().stop()
+    await get_notifier().stop()
+    print("Closing database connections...")
+    db_executor.shutdown()
+    close_all()
 
 
 # Run the app (only needed if you are running this file directly)
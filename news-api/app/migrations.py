@@ -0,0 +1,132 @@
+from peewee import SqliteDatabase
+from playhouse.migrate import SchemaMigrator, migrate
+
+from app.db import get_shards, use_shard
+from app.entities.daily_article_count_entity import DailyArticleCountEntity
+from app.entities.migration_entity import MigrationEntity
+from app.entities.news_article_content_entity import NewsArticleContentEntity
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+from app.entities.verification_entity import VerificationEntity
+from app.services.article_content_repository import ArticleContentRepository
+from app.services.article_search_repository import ArticleSearchRepository
+from app.services.daily_article_count_repository import DailyArticleCountRepository
+
+CONTENT_BATCH_SIZE = 1000  # Articles moved per query by 0005_article_contents
+
+
+def create_tables(db):
+    db.create_tables([NewspaperEntity, NewsArticleEntity])
+
+
+def add_newspaper_date_index(db):
+    """Adds the (newspaper_id, date_uploaded) index and the newspapers foreign
+    key to tables created before they were declared on the entity."""
+    migrator = SchemaMigrator.from_database(db)
+    table = NewsArticleEntity._meta.table_name
+
+    indexes = {tuple(index.columns) for index in db.get_indexes(table)}
+    if ("newspaper_id", "date_uploaded") not in indexes:
+        migrate(migrator.add_index(table, ("newspaper_id", "date_uploaded"), False))
+
+    # SQLite can't add constraints to an existing table, only new ones get it
+    foreign_keys = {fk.column for fk in db.get_foreign_keys(table)}
+    if "newspaper_id" not in foreign_keys and not isinstance(db, SqliteDatabase):
+        # Deleting a newspaper used to leave its articles, which the
+        # constraint would reject
+        orphans = NewsArticleEntity.delete().where(
+            NewsArticleEntity.newspaper_id.not_in(NewspaperEntity.select(NewspaperEntity.id))
+        ).execute()
+        if orphans:
+            print(f"Deleted {orphans} articles of deleted newspapers")
+        migrate(
+            migrator.add_foreign_key_constraint(
+                table, "newspaper_id", NewspaperEntity._meta.table_name, "id", on_delete="CASCADE"
+            )
+        )
+
+
+def create_daily_article_counts(db):
+    db.create_tables([DailyArticleCountEntity])
+    DailyArticleCountRepository().rebuild()
+
+
+def create_article_search(db):
+    # Tables created with the current entity have no content column, their
+    # index is created by 0005_article_contents
+    table = NewsArticleEntity._meta.table_name
+    if "content" in {column.name for column in db.get_columns(table)}:
+        ArticleSearchRepository().create_legacy_index()
+
+
+def move_article_contents(db):
+    """Moves the content of the articles to news_article_contents,
+    compressed, and rebuilds the search index over it."""
+    db.create_tables([NewsArticleContentEntity])
+    search_index = ArticleSearchRepository()
+    search_index.drop_legacy_index()
+    search_index.create_index()
+
+    table = NewsArticleEntity._meta.table_name
+    if "content" not in {column.name for column in db.get_columns(table)}:
+        return
+
+    contents = ArticleContentRepository()
+    after_id = 0
+    while True:
+        # Raw SQL, the entity no longer has the column
+        rows = db.execute_sql(
+            f"SELECT id, title, content FROM {table} WHERE id > {db.param} ORDER BY id LIMIT {db.param}",
+            (after_id, CONTENT_BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        contents.save_many({id: content for id, _, content in rows})
+        search_index.index_many({"id": id, "title": title, "content": content} for id, title, content in rows)
+        after_id = rows[-1][0]
+
+    migrate(SchemaMigrator.from_database(db).drop_column(table, "content"))
+
+
+def create_verifications(db):
+    db.create_tables([VerificationEntity])
+
+
+def add_daily_count_versions(db):
+    table = DailyArticleCountEntity._meta.table_name
+    # Tables created by 0003 on a new database already have the column
+    if "version" not in {column.name for column in db.get_columns(table)}:
+        migrate(SchemaMigrator.from_database(db).add_column(table, "version", DailyArticleCountEntity.version))
+
+
+# Applied in order, each one only once. Append new migrations at the end.
+MIGRATIONS = [
+    ("0001_create_tables", create_tables),
+    ("0002_newspaper_date_index", add_newspaper_date_index),
+    ("0003_daily_article_counts", create_daily_article_counts),
+    ("0004_article_search", create_article_search),
+    ("0005_article_contents", move_article_contents),
+    ("0006_verifications", create_verifications),
+    ("0007_daily_count_versions", add_daily_count_versions),
+]
+
+
+def run_migrations():
+    # Every shard has the whole schema and its own list of applied migrations
+    for index, db in enumerate(get_shards()):
+        with use_shard(index):
+            db.create_tables([MigrationEntity])
+            applied = {migration.name for migration in MigrationEntity.select()}
+
+            for name, migration in MIGRATIONS:
+                if name in applied:
+                    continue
+
+                print(f"Applying migration {name} to shard {index}...")
+                with db.atomic():
+                    migration(db)
+                    MigrationEntity.create(name=name)
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,14 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BulkError(BaseModel):
+    index: int  # Position of the item in the request body
+    id: Optional[int] = None
+    detail: str
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    errors: List[BulkError] = []
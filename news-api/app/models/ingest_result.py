@@ -0,0 +1,14 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class IngestError(BaseModel):
+    line: int  # 1-based line number in the request body
+    detail: str
+
+
+class IngestResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[IngestError] = []  # The first errors only
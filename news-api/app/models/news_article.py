@@ -1,11 +1,21 @@
 from datetime import date
+from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, constr
 
 
 class NewsArticle(BaseModel):
     id: int
     newspaper_id: int
     title: str
-    content: str
+    content: Optional[str] = None  # Only loaded for a single article, or when asked for
     date_uploaded: date
+
+
+class NewsArticleInput(BaseModel):
+    """An article to create, the id is assigned by the database."""
+
+    newspaper_id: int
+    title: constr(max_length=255)
+    content: str
+    date_uploaded: Optional[date] = None  # Today by default
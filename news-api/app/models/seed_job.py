@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SeedJob(BaseModel):
+    id: str
+    status: str  # "queued", "running", "finished" or "failed"
+    newspapers_count: int
+    articles_count: int
+    newspapers_created: int = 0
+    articles_created: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))  # Alerts waiting, newer ones are dropped
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))  # Alerts per message
+NOTIFY_BATCH_WINDOW = float(os.getenv("NOTIFY_BATCH_WINDOW", "5"))  # Seconds to wait for a batch to fill
+NOTIFY_MIN_INTERVAL = float(os.getenv("NOTIFY_MIN_INTERVAL", "60"))  # Seconds between messages of a backend
+NOTIFY_RETRIES = int(os.getenv("NOTIFY_RETRIES", "3"))  # Retries of a failed message
+NOTIFY_RETRY_DELAY = float(os.getenv("NOTIFY_RETRY_DELAY", "2"))  # Seconds, doubled after each retry
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "10"))  # Seconds per delivery attempt
+
+NOTIFY_SMTP_HOST = os.getenv("NOTIFY_SMTP_HOST", "")  # Empty disables email
+NOTIFY_SMTP_PORT = int(os.getenv("NOTIFY_SMTP_PORT", "25"))
+NOTIFY_SMTP_STARTTLS = os.getenv("NOTIFY_SMTP_STARTTLS", "0") == "1"
+NOTIFY_SMTP_USER = os.getenv("NOTIFY_SMTP_USER", "")
+NOTIFY_SMTP_PASSWORD = os.getenv("NOTIFY_SMTP_PASSWORD", "")
+NOTIFY_SMTP_FROM = os.getenv("NOTIFY_SMTP_FROM", "news-api@localhost")
+NOTIFY_SMTP_TO = os.getenv("NOTIFY_SMTP_TO", "")  # Comma separated
+NOTIFY_WEBHOOK_URL = os.getenv("NOTIFY_WEBHOOK_URL", "")  # Empty disables the webhook
+
+
+class NotifierBackend(ABC):
+    """Delivers a batch of alerts, raising an exception when it fails."""
+
+    name = "backend"
+
+    @abstractmethod
+    async def send(self, alerts: List[dict]):
+        pass
+
+
+class SmtpBackend(NotifierBackend):
+    """One email per batch. smtplib blocks, it runs in a thread."""
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: List[str],
+        user: str = "",
+        password: str = "",
+        starttls: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+
+    async def send(self, alerts: List[dict]):
+        await asyncio.to_thread(self.send_message, format_message(alerts))
+
+    def send_message(self, body: str):
+        message = EmailMessage()
+        message["Subject"] = "News API: article counts below expected"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(body)
+
+        with smtplib.SMTP(self.host, self.port, timeout=NOTIFY_TIMEOUT) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+
+
+class WebhookBackend(NotifierBackend):
+    """POSTs {"text": ..., "alerts": [...]}, the text is what chat webhooks
+    display."""
+
+    name = "webhook"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def send(self, alerts: List[dict]):
+        async with httpx.AsyncClient(timeout=NOTIFY_TIMEOUT) as client:
+            response = await client.post(
+                self.url, json={"text": format_message(alerts), "alerts": alerts}
+            )
+            response.raise_for_status()
+
+
+def format_message(alerts: List[dict]) -> str:
+    return "\n".join(
+        f"Newspaper {alert['newspaper_id']} ({alert['day']}): {alert['message']}" for alert in alerts
+    )
+
+
+class Notifier:
+    """Delivers alerts in the background, so callers never wait for them.
+
+    `notify` only puts the alert in a bounded queue. A worker task takes
+    the alerts in batches and sends each batch to every backend, at most
+    one delivered message per backend every `min_interval` seconds,
+    retrying failed deliveries with an exponential backoff. Alerts still
+    failing after the retries, or arriving while the queue is full, are
+    dropped and counted.
+    """
+
+    def __init__(
+        self,
+        backends: List[NotifierBackend],
+        queue_size: int = NOTIFY_QUEUE_SIZE,
+        batch_size: int = NOTIFY_BATCH_SIZE,
+        batch_window: float = NOTIFY_BATCH_WINDOW,
+        min_interval: float = NOTIFY_MIN_INTERVAL,
+        retries: int = NOTIFY_RETRIES,
+        retry_delay: float = NOTIFY_RETRY_DELAY,
+    ):
+        self.backends = backends
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.last_sent = {}  # Backend name -> monotonic time of the last message
+        self.counters = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0, "retried": 0}
+
+    def start(self):
+        # Created here, the queue belongs to the running event loop
+        self.queue = asyncio.Queue(self.queue_size)
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = NOTIFY_TIMEOUT):
+        """Delivers the queued alerts, for at most `timeout` seconds."""
+        if self.worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.worker.cancel()
+        self.worker = None
+
+    def notify(self, alert: dict):
+        if self.queue is None or not self.backends:
+            return
+        try:
+            self.queue.put_nowait(alert)
+            self.counters["queued"] += 1
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+
+    async def run(self):
+        while True:
+            batch = await self.next_batch()
+            try:
+                await asyncio.gather(*(self.deliver(backend, batch) for backend in self.backends))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def next_batch(self) -> List[dict]:
+        """Waits for an alert, then for more during the batch window."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def deliver(self, backend: NotifierBackend, alerts: List[dict]):
+        # Alerts arriving while this waits go to the next batch
+        last_sent = self.last_sent.get(backend.name)
+        if last_sent is not None:
+            await asyncio.sleep(max(0.0, last_sent + self.min_interval - time.monotonic()))
+
+        for attempt in range(self.retries + 1):
+            try:
+                await backend.send(alerts)
+                self.last_sent[backend.name] = time.monotonic()
+                self.counters["sent"] += len(alerts)
+                return
+            except Exception:
+                logger.exception("Sending %d alerts through %s failed", len(alerts), backend.name)
+                if attempt < self.retries:
+                    self.counters["retried"] += 1
+                    await asyncio.sleep(self.retry_delay * 2**attempt)
+
+        self.counters["failed"] += len(alerts)
+
+    def stats(self):
+        return {**self.counters, "waiting": self.queue.qsize() if self.queue else 0}
+
+
+def create_backends() -> List[NotifierBackend]:
+    backends = []
+    if NOTIFY_SMTP_HOST and NOTIFY_SMTP_TO:
+        backends.append(
+            SmtpBackend(
+                NOTIFY_SMTP_HOST,
+                NOTIFY_SMTP_PORT,
+                NOTIFY_SMTP_FROM,
+                [address.strip() for address in NOTIFY_SMTP_TO.split(",") if address.strip()],
+                NOTIFY_SMTP_USER,
+                NOTIFY_SMTP_PASSWORD,
+                NOTIFY_SMTP_STARTTLS,
+            )
+        )
+    if NOTIFY_WEBHOOK_URL:
+        backends.append(WebhookBackend(NOTIFY_WEBHOOK_URL))
+    return backends
+
+
+notifier = Notifier(create_backends())
+
+
+def get_notifier() -> Notifier:
+    return notifier
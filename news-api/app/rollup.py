@@ -0,0 +1,14 @@
+from app.db import scatter
+from app.services.daily_article_count_repository import DailyArticleCountRepository
+
+
+def rebuild_daily_article_counts():
+    """Backfills the daily_article_counts rollup from the articles table,
+    on every shard."""
+    scatter(DailyArticleCountRepository().rebuild)
+
+
+if __name__ == "__main__":
+    print("Rebuilding daily article counts...")
+    rebuild_daily_article_counts()
+    print("Done")
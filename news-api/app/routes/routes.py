@@ -1,25 +1,26 @@
+import os
+
 from fastapi import APIRouter
 
-from app.controllers.base_controller import BaseController
 from app.controllers.faker_controller import get_faker_router
+from app.controllers.news_article_controller import get_news_article_controller
 from app.controllers.newspaper_controller import get_newspaper_controller
 from app.controllers.report_controller import get_report_router
-from app.controllers.test_controller import get_test_router
-from app.entities.news_article_entity import NewsArticleEntity
-from app.entities.newspaper_entity import NewspaperEntity
-from app.models.news_article import NewsArticle
+from app.instrumentation import TimedRoute
 from app.models.newspaper import Newspaper
-from app.services.base_service import BaseService
+from app.services.news_article_service import get_news_article_service
+from app.services.newspaper_service import get_newspaper_service
+
+# The statistical test routes can be left out of the deployment
+TESTS_ROUTES_ENABLED = os.getenv("TESTS_ROUTES_ENABLED", "1") == "1"
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-newspaper_service = BaseService(NewspaperEntity)
-news_article_service = BaseService(NewsArticleEntity)
+newspaper_service = get_newspaper_service()
+news_article_service = get_news_article_service()
 
 newspaper_controller = get_newspaper_controller()
-news_article_controller = BaseController(
-    NewsArticle, NewsArticleEntity, news_article_service
-)
+news_article_controller = get_news_article_controller()
 
 router.include_router(
     newspaper_controller.get_router(),
@@ -34,5 +35,8 @@ router.include_router(
 )
 
 router.include_router(get_report_router(), prefix="/reports", tags=["Reports"])
-router.include_router(get_test_router(), prefix="/tests", tags=["Tests"])
+if TESTS_ROUTES_ENABLED:
+    from app.controllers.test_controller import get_test_router
+
+    router.include_router(get_test_router(), prefix="/tests", tags=["Tests"])
 router.include_router(get_faker_router(), prefix="/faker", tags=["Faker"])
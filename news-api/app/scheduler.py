@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from app.executor import run_in_db
+from app.notifications import Notifier, get_notifier
+from app.services.verification_service import run_verification
+
+logger = logging.getLogger(__name__)
+
+# Local time of the daily verification of every newspaper, as HH:MM. Empty
+# disables it; with several API processes, enable it in one of them only
+VERIFY_AT = os.getenv("VERIFY_AT", "")
+
+
+class VerificationScheduler:
+    """Runs the verification of every newspaper once a day, stores the
+    verdicts and hands the alerts to the notifier."""
+
+    def __init__(self, at: Optional[time], notifier: Notifier):
+        self.at = at
+        self.notifier = notifier
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_alerts = 0
+        self.last_run: Optional[datetime] = None
+
+    def start(self):
+        if self.at is not None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(get_delay(datetime.now(), self.at))
+            try:
+                await self.run_once(date.today())
+            except Exception:
+                self.failures += 1
+                logger.exception("Scheduled verification failed")
+
+    async def run_once(self, today: date):
+        """Verifies every newspaper now. Returns the number of alerts, which
+        are sent in the background."""
+        alerts = await run_in_db(run_verification, today)
+        for verdict in alerts:
+            self.notifier.notify({**verdict, "day": today.isoformat()})
+
+        self.runs += 1
+        self.last_alerts = len(alerts)
+        self.last_run = datetime.now()
+        return len(alerts)
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_alerts": self.last_alerts,
+            "last_run_timestamp": self.last_run.timestamp() if self.last_run else 0,
+        }
+
+
+def get_delay(now: datetime, at: time) -> float:
+    """Seconds until the next `at` time of day."""
+    next_run = datetime.combine(now.date(), at)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+scheduler = VerificationScheduler(
+    time.fromisoformat(VERIFY_AT) if VERIFY_AT else None, get_notifier()
+)
+
+
+def get_scheduler() -> VerificationScheduler:
+    return scheduler
@@ -0,0 +1,42 @@
+import argparse
+import time
+
+from app.db import get_db
+from app.migrations import run_migrations
+from app.services.seed_service import seed_newspapers_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeds the database with fake newspapers and articles")
+    parser.add_argument("--newspapers", type=int, required=True, help="Number of newspapers to create")
+    parser.add_argument("--articles", type=int, required=True, help="Number of articles per newspaper")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Articles per INSERT")
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating the fake content")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible datasets")
+    args = parser.parse_args()
+
+    run_migrations()
+
+    start = time.perf_counter()
+    total_articles = args.newspapers * args.articles
+
+    def progress(newspapers_created, articles_created):
+        elapsed = time.perf_counter() - start
+        print(
+            f"{newspapers_created} newspapers, {articles_created}/{total_articles} articles "
+            f"({articles_created / elapsed:.0f} articles/s)"
+        )
+
+    with get_db().connection_context():
+        seed_newspapers_articles(
+            args.newspapers,
+            args.articles,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            seed=args.seed,
+            progress=progress,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import zlib
+from typing import Dict, Iterable, Optional
+
+from app.entities.news_article_content_entity import NewsArticleContentEntity
+
+COMPRESSION_LEVEL = 6  # zlib's default trade-off between size and speed
+
+
+def compress(content: str) -> bytes:
+    return zlib.compress(content.encode(), COMPRESSION_LEVEL)
+
+
+def decompress(body: bytes) -> str:
+    return zlib.decompress(body).decode()
+
+
+class ArticleContentRepository:
+    """Compressed article bodies, by article id. Rows are deleted with their
+    article by the foreign key."""
+
+    def __init__(self):
+        self.entity = NewsArticleContentEntity
+
+    def save_many(self, contents: Dict[int, str]):
+        """Inserts or replaces the body of each article."""
+        rows = [
+            {"article_id": id, "body": compress(content)} for id, content in contents.items()
+        ]
+        if rows:
+            self.entity.insert_many(rows).on_conflict_replace().execute()
+
+    def get(self, id: int) -> Optional[str]:
+        return self.get_many([id]).get(id)
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, str]:
+        query = self.entity.select(self.entity.article_id, self.entity.body).where(
+            self.entity.article_id.in_(list(ids))
+        )
+        return {id: decompress(bytes(body)) for id, body in query.tuples()}
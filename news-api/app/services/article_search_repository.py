@@ -0,0 +1,184 @@
+import re
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from app.db import is_mysql
+from app.entities.news_article_entity import NewsArticleEntity
+
+SEARCH_TABLE = "news_articles_search"
+ROWS_PER_STATEMENT = 500  # Rows written per INSERT, within the parameter limits
+
+
+class ArticleSearchRepository:
+    """Full-text index over the title and content of the articles.
+
+    The content lives compressed in news_article_contents, so the index is
+    written by NewsArticleService along with the articles. MySQL uses a
+    table with a FULLTEXT index, SQLite a contentless FTS5 table: it only
+    keeps the index, and removing an article needs its indexed text.
+    """
+
+    def __init__(self):
+        self.entity = NewsArticleEntity
+
+    @property
+    def database(self):
+        return self.entity._meta.database
+
+    def is_mysql(self):
+        return is_mysql(self.database)
+
+    def create_index(self):
+        # MySQL commits DDL statements at once, a migration failing after
+        # them must be able to run again
+        if self.is_mysql():
+            self.database.execute_sql(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (id INT PRIMARY KEY, title VARCHAR(255) NOT NULL, "
+                f"content LONGTEXT NOT NULL, FULLTEXT INDEX {SEARCH_TABLE}_text (title, content))"
+            )
+        else:
+            self.database.execute_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(title, content, content='')"
+            )
+
+    def create_legacy_index(self):
+        """Creates the index of the 0004_article_search migration over the
+        content column of news_articles, and fills it."""
+        table = self.entity._meta.table_name
+        if self.is_mysql():
+            self.database.execute_sql(
+                f"ALTER TABLE {table} ADD FULLTEXT INDEX {SEARCH_TABLE} (title, content)"
+            )
+            return
+
+        statements = [
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"title, content, content='{table}', content_rowid='id')",
+            f"CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {SEARCH_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+            f"CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, content) "
+            f"VALUES ('delete', old.id, old.title, old.content); END",
+            f"CREATE TRIGGER {SEARCH_TABLE}_update AFTER UPDATE OF title, content ON {table} BEGIN "
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, content) "
+            f"VALUES ('delete', old.id, old.title, old.content); "
+            f"INSERT INTO {SEARCH_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            self.database.execute_sql(statement)
+
+    def drop_legacy_index(self):
+        """Drops the index of the 0004_article_search migration, built over
+        the content column of news_articles."""
+        table = self.entity._meta.table_name
+        if self.is_mysql():
+            if SEARCH_TABLE in {index.name for index in self.database.get_indexes(table)}:
+                self.database.execute_sql(f"ALTER TABLE {table} DROP INDEX {SEARCH_TABLE}")
+            return
+
+        for trigger in ("insert", "delete", "update"):
+            self.database.execute_sql(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{trigger}")
+        self.database.execute_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index_many(self, rows: Iterable[dict]):
+        """Adds articles, as dicts with their id, title and content."""
+        columns = "id, title, content" if self.is_mysql() else "rowid, title, content"
+        self.insert_rows(
+            f"INSERT INTO {SEARCH_TABLE} ({columns}) VALUES ",
+            [(row["id"], row["title"], row["content"]) for row in rows],
+        )
+
+    def remove_many(self, rows: Iterable[dict]):
+        """Removes articles, as dicts with the id, title and content they
+        were indexed with."""
+        rows = list(rows)
+        if self.is_mysql():
+            for start in range(0, len(rows), ROWS_PER_STATEMENT):
+                ids = [row["id"] for row in rows[start : start + ROWS_PER_STATEMENT]]
+                placeholders = ", ".join([self.database.param] * len(ids))
+                self.database.execute_sql(f"DELETE FROM {SEARCH_TABLE} WHERE id IN ({placeholders})", ids)
+            return
+
+        # The 'delete' command of a contentless table takes the indexed values
+        self.insert_rows(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, content) VALUES ",
+            [("delete", row["id"], row["title"], row["content"]) for row in rows],
+        )
+
+    def insert_rows(self, sql: str, rows: List[tuple]):
+        for start in range(0, len(rows), ROWS_PER_STATEMENT):
+            chunk = rows[start : start + ROWS_PER_STATEMENT]
+            values = "(" + ", ".join([self.database.param] * len(chunk[0])) + ")"
+            self.database.execute_sql(
+                sql + ", ".join([values] * len(chunk)),
+                [value for row in chunk for value in row],
+            )
+
+    def search(
+        self,
+        terms: List[str],
+        newspaper_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        after: Optional[Tuple[float, int]] = None,
+        limit: int = 20,
+    ):
+        """Articles containing every term, best match first, as dicts with a
+        `score` (lower is better). `after` is the (score, id) of the last
+        article of the previous page."""
+        param = self.database.param
+        table = self.entity._meta.table_name
+
+        if self.is_mysql():
+            match = f"MATCH(s.title, s.content) AGAINST ({param} IN BOOLEAN MODE)"
+            query = " ".join(f'+"{term}"' for term in terms)
+            select = (
+                f"SELECT a.id, a.newspaper_id, a.title, a.date_uploaded, -{match} AS score "
+                f"FROM {SEARCH_TABLE} s JOIN {table} a ON a.id = s.id WHERE {match}"
+            )
+            params = [query, query]
+        else:
+            select = (
+                f"SELECT a.id, a.newspaper_id, a.title, a.date_uploaded, bm25({SEARCH_TABLE}) AS score "
+                f"FROM {SEARCH_TABLE} JOIN {table} a ON a.id = {SEARCH_TABLE}.rowid "
+                f"WHERE {SEARCH_TABLE} MATCH {param}"
+            )
+            params = [" ".join(f'"{term}"' for term in terms)]
+
+        filters = []
+        if newspaper_id is not None:
+            filters.append(f"a.newspaper_id = {param}")
+            params.append(newspaper_id)
+        if start_date is not None:
+            filters.append(f"a.date_uploaded >= {param}")
+            params.append(start_date)
+        if end_date is not None:
+            filters.append(f"a.date_uploaded <= {param}")
+            params.append(end_date)
+
+        sql = " AND ".join([select] + filters)
+
+        # The score is only known once the matches are ranked, the page
+        # cursor applies to the ranked rows
+        sql = f"SELECT * FROM ({sql}) matches"
+        if after is not None:
+            sql += f" WHERE score > {param} OR (score = {param} AND id > {param})"
+            params += [after[0], after[0], after[1]]
+        sql += f" ORDER BY score, id LIMIT {param}"
+        params.append(limit)
+
+        cursor = self.database.execute_sql(sql, params)
+        columns = [column[0] for column in cursor.description]
+        date_uploaded = self.entity.date_uploaded
+        rows = []
+        for values in cursor.fetchall():
+            row = dict(zip(columns, values))
+            row["date_uploaded"] = date_uploaded.python_value(row["date_uploaded"])
+            rows.append(row)
+        return rows
+
+
+def parse_terms(query: str) -> List[str]:
+    """Words of a search query, without any search operator."""
+    return re.findall(r"\w+", query.lower())
@@ -1,12 +1,42 @@
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Dict, Generic, Iterable, List, Optional, Type, TypeVar
+
+from peewee import Case, fn
+
+from app.db import get_shard_map, is_mysql
 
 
 class BaseRepository:
     def __init__(self, entity):
         self.entity = entity
 
-    def get_all(self):
-        return list(self.entity.select())
+    def atomic(self):
+        return self.entity._meta.database.atomic()
+
+    def get_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        """Yields rows as dicts ordered by id, starting after `after_id`.
+
+        The cursor is consumed with `.iterator()` so peewee does not cache
+        the rows; `fields` restricts the selected columns (id is always
+        included, it is the pagination key).
+        """
+        columns = []
+        if fields:
+            columns = [self.entity.id] + [
+                self.entity._meta.fields[name] for name in fields if name != "id"
+            ]
+
+        query = self.entity.select(*columns).order_by(self.entity.id)
+        if after_id is not None:
+            query = query.where(self.entity.id > after_id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query.dicts().iterator()
 
     def get_by_id(self, id: int):
         try:
@@ -14,9 +44,67 @@ class BaseRepository:
         except self.entity.DoesNotExist:
             return None
 
+    def get_many(self, ids: Iterable[int], fields: Optional[List[str]] = None):
+        columns = []
+        if fields:
+            columns = [self.entity.id] + [self.entity._meta.fields[name] for name in fields]
+        return list(self.entity.select(*columns).where(self.entity.id.in_(list(ids))))
+
+    def get_existing_ids(self, ids: Iterable[int]):
+        query = self.entity.select(self.entity.id).where(self.entity.id.in_(list(ids)))
+        return {id for (id,) in query.tuples()}
+
     def create(self, model):
         return self.entity.create(**model)
 
+    def create_many(self, models: List[dict]) -> List[int]:
+        """Single INSERT with one row per model, returns the new ids in the
+        order of the models."""
+        query = self.entity.insert_many(models)
+        if not is_mysql(self.entity._meta.database):
+            return [id for (id,) in query.returning(self.entity.id).tuples().execute()]
+
+        # MySQL has no RETURNING, it gives the first id of the statement and
+        # the ids of a multi-row insert follow, one shard count apart
+        first_id = query.execute()
+        step = get_shard_map().count
+        return list(range(first_id, first_id + len(models) * step, step))
+
+    def next_ids(self, count: int, shard: int, shards_count: int) -> List[int]:
+        """Interleaved ids for new rows of a shard, for databases that can't
+        generate them (SQLite): the next ones with (id - 1) % shards_count
+        equal to `shard`."""
+        last_id = self.entity.select(fn.MAX(self.entity.id)).scalar() or 0
+        first_id = last_id + 1 + (shard - last_id) % shards_count
+        return list(range(first_id, first_id + count * shards_count, shards_count))
+
+    def update_many(self, changes: Dict[int, dict]) -> int:
+        """Applies the changed fields of each id with a single UPDATE ...
+        WHERE id IN statement. Only the changed columns are set, through a
+        CASE on the id when the rows get different values."""
+        values_by_field = {}
+        for id, fields in changes.items():
+            for name, value in fields.items():
+                values_by_field.setdefault(name, []).append((id, value))
+        if not values_by_field:
+            return 0
+
+        update = {}
+        for name, values in values_by_field.items():
+            field = self.entity._meta.fields[name]
+            if len(values) == len(changes) and all(value == values[0][1] for _, value in values):
+                update[field] = values[0][1]
+            else:
+                update[field] = Case(
+                    self.entity.id, [(id, field.to_value(value)) for id, value in values], field
+                )
+
+        query = self.entity.update(update).where(self.entity.id.in_(list(changes)))
+        return query.execute()
+
     def delete(self, id: int) -> bool:
         query = self.entity.delete().where(self.entity.id == id)
         return query.execute() > 0
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        return self.entity.delete().where(self.entity.id.in_(list(ids))).execute()
@@ -1,25 +1,208 @@
-from peewee import Model
-from pydantic import BaseModel
+import heapq
+from contextlib import ExitStack, contextmanager, nullcontext
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
 
+from peewee import DataError, IntegrityError
+
+from app.db import connected, get_shard_map, get_shards, is_mysql, scatter, use_shard
+from app.executor import run_in_db
 from app.services.base_repository import BaseRepository
 
+# Rows fetched per query when streaming a whole table
+STREAM_CHUNK_SIZE = 500
+
+# Items written per transaction by the bulk operations
+BULK_CHUNK_SIZE = 1000
+
 
 class BaseService:
-    def __init__(self, entity):
+    """CRUD over an entity, routed to the shards.
+
+    Entities with a `shard_key` (a newspaper_id field) live on the shard of
+    their newspaper: writes go to that shard, reads by id to the shard of
+    the id, and lists are gathered from every shard. Entities without one
+    are copied to every shard, with the same ids, so each shard can join
+    them; they are read from a single shard.
+    """
+
+    def __init__(self, entity, shard_key: Optional[str] = None):
         self.repository = BaseRepository(entity)
+        self.shard_key = shard_key
+        self.shards = get_shard_map()
+
+    def is_sharded(self):
+        return self.shard_key is not None and self.shards.count > 1
+
+    def shard_for(self, model: dict) -> int:
+        if not self.is_sharded():
+            return 0
+        if model.get(self.shard_key) is None:
+            raise IntegrityError(f"Missing field '{self.shard_key}'")
+        try:
+            return self.shards.shard_for(int(model[self.shard_key]))
+        except (TypeError, ValueError):
+            raise IntegrityError(f"Field '{self.shard_key}' must be an integer")
+
+    def use_shard_of_id(self, id: int):
+        """Routes the block to the shard of an id, or leaves it on the
+        current one when every shard has the row."""
+        return use_shard(self.shards.shard_of_id(id)) if self.is_sharded() else nullcontext()
+
+    def group_ids(self, ids: Iterable[int]) -> Dict[int, List[int]]:
+        groups = {}
+        for id in ids:
+            groups.setdefault(self.shards.shard_of_id(id) if self.is_sharded() else 0, []).append(id)
+        return groups
+
+    def group_models(self, models: List[dict]) -> Dict[int, List[int]]:
+        """Indexes of the models going to each shard."""
+        groups = {}
+        for index, model in enumerate(models):
+            groups.setdefault(self.shard_for(model) if self.is_sharded() else 0, []).append(index)
+        return groups
+
+    def check_shard_key(self, id: int, fields: dict):
+        # Ids are tied to their shard, a row can't move to another one
+        if self.is_sharded() and self.shard_key in fields:
+            if self.shard_for(fields) != self.shards.shard_of_id(id):
+                raise IntegrityError(f"Changing '{self.shard_key}' would move item {id} to another shard")
 
-    def get_all(self):
-        models = list(self.repository.get_all())
-        return [model.__data__ for model in models]
+    def with_ids(self, models: List[dict]) -> List[dict]:
+        """Models of the current shard with interleaved ids, when the
+        database can't generate them."""
+        if not self.is_sharded() or is_mysql(self.repository.entity._meta.database):
+            return models
+        ids = self.repository.next_ids(len(models), self.shard_for(models[0]), self.shards.count)
+        return [{**model, "id": id} for model, id in zip(models, ids)]
+
+    def get_all(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        if not self.is_sharded():
+            return list(self.repository.get_page(after_id, limit, fields))
+
+        # Each shard returns its own first page, the page is the lowest ids
+        pages = scatter(lambda: list(self.repository.get_page(after_id, limit, fields)))
+        return list(islice(heapq.merge(*pages, key=itemgetter("id")), limit))
+
+    async def iter_all(
+        self,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ):
+        """Yields rows in keyset-paginated chunks, so at most `chunk_size`
+        rows are held in memory at any time. Each chunk is fetched as its
+        own job on the database executor."""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+
+            rows = await run_in_db(self.get_all, after_id, page_size, fields)
+            for row in rows:
+                yield row
+
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1]["id"]
+            if remaining is not None:
+                remaining -= len(rows)
 
     def get_by_id(self, id: int):
-        return self.repository.get_by_id(id)
+        with self.use_shard_of_id(id):
+            return self.repository.get_by_id(id)
+
+    def get_existing_ids(self, ids: Iterable[int]):
+        existing = set()
+        for group in self.group_ids(ids).values():
+            with self.use_shard_of_id(group[0]):
+                existing |= self.repository.get_existing_ids(group)
+        return existing
 
     def create(self, model):
-        return self.repository.create(model)
+        if self.is_sharded():
+            with use_shard(self.shard_for(model)):
+                return self.repository.create(self.with_ids([model])[0])
+
+        with self.replicated_writes():
+            with use_shard(0):
+                created = self.repository.create(model)
+            self.replicate([{**model, "id": created.id}])
+        return created
+
+    def create_many(self, models: List[dict]):
+        """Returns the new ids in the order of the models, with one INSERT
+        per shard."""
+        if not models:
+            return []
+        if not self.is_sharded():
+            with self.replicated_writes():
+                with use_shard(0):
+                    ids = self.repository.create_many(models)
+                self.replicate([{**model, "id": id} for model, id in zip(models, ids)])
+            return ids
+
+        ids = [None] * len(models)
+        for shard, indexes in self.group_models(models).items():
+            with use_shard(shard):
+                created = self.repository.create_many(self.with_ids([models[index] for index in indexes]))
+            for index, id in zip(indexes, created):
+                ids[index] = id
+        return ids
+
+    @contextmanager
+    def replicated_writes(self):
+        """Keeps a transaction open on every shard for the block, so that
+        rows written to the first shard and copied to the others are rolled
+        back everywhere if a copy fails, and can be written again."""
+        if self.shard_key is not None:
+            yield
+            return
+        with ExitStack() as stack:
+            for database in get_shards():
+                stack.enter_context(connected(database))
+                stack.enter_context(database.atomic())
+            yield
+
+    def replicate(self, models: List[dict]):
+        """Copies new rows of an entity without shard key, ids included,
+        from the first shard to the others."""
+        if self.shard_key is not None:
+            return
+        for shard in range(1, self.shards.count):
+            with use_shard(shard):
+                self.repository.create_many(models)
+
+    def on_shards_of(self, ids: Iterable[int], fn) -> int:
+        """Runs `fn` with the ids of each shard and sums its results. Entities
+        without shard key run it on every shard, with all the ids, and return
+        the first shard's result."""
+        ids = list(ids)
+        if self.shard_key is None and self.shards.count > 1:
+            return scatter(fn, ids)[0]
+
+        total = 0
+        for group in self.group_ids(ids).values():
+            with self.use_shard_of_id(group[0]):
+                total += fn(group)
+        return total
 
     def update(self, model):
-        existing = self.get_by_id(model["id"])
+        self.check_shard_key(model["id"], model)
+        if self.shard_key is None and self.shards.count > 1:
+            return scatter(self.update_row, model)[0]
+
+        with self.use_shard_of_id(model["id"]):
+            return self.update_row(model)
+
+    def update_row(self, model):
+        existing = self.repository.get_by_id(model["id"])
         if existing is None:
             return None
 
@@ -31,4 +214,136 @@ class BaseService:
         return existing
 
     def delete(self, id: int):
-        return self.repository.delete(id)
+        return self.on_shards_of([id], self.repository.delete_many) > 0
+
+    def update_many(self, changes: Dict[int, dict]):
+        for id, fields in changes.items():
+            self.check_shard_key(id, fields)
+        return self.on_shards_of(
+            changes, lambda ids: self.repository.update_many({id: changes[id] for id in ids})
+        )
+
+    def delete_many(self, ids: List[int]):
+        return self.on_shards_of(ids, self.repository.delete_many)
+
+    def validate(self, model: dict, partial: bool = False) -> Optional[str]:
+        """Returns why `model` can't be written, or None. Partial models
+        (updates) don't need the required fields."""
+        fields = self.repository.entity._meta.fields
+        unknown = [name for name in model if name not in fields]
+        if unknown:
+            return f"Unknown fields: {', '.join(unknown)}"
+
+        for name, field in fields.items():
+            if field.primary_key or field.null:
+                continue
+            if name in model and model[name] is None:
+                return f"Field '{name}' can't be null"
+            if not partial and name not in model and field.default is None:
+                return f"Missing field '{name}'"
+
+        if self.is_sharded() and model.get(self.shard_key) is not None:
+            try:
+                self.shard_for(model)
+            except IntegrityError as e:
+                return str(e)
+        return None
+
+    def bulk_create(self, models: List[dict], chunk_size: int = BULK_CHUNK_SIZE):
+        """Inserts the models with one INSERT and one transaction per chunk.
+        A chunk rejected by the database is retried item by item, to report
+        which items failed and keep the others."""
+        succeeded, errors = 0, []
+        for start in range(0, len(models), chunk_size):
+            valid = []
+            for index, model in enumerate(models[start : start + chunk_size], start):
+                error = self.validate(model)
+                if error:
+                    errors.append({"index": index, "detail": error})
+                else:
+                    valid.append((index, model))
+            if not valid:
+                continue
+
+            # Shards commit separately, a rejected group must not retry
+            # the items of another shard
+            for indexes in self.group_models([model for _, model in valid]).values():
+                group = [valid[position] for position in indexes]
+                try:
+                    self.create_many([model for _, model in group])
+                    succeeded += len(group)
+                except (DataError, IntegrityError):
+                    for index, model in group:
+                        try:
+                            self.create(model)
+                            succeeded += 1
+                        except (DataError, IntegrityError) as e:
+                            errors.append({"index": index, "detail": str(e)})
+
+        return {"succeeded": succeeded, "errors": errors}
+
+    def bulk_update(self, models: List[dict], chunk_size: int = BULK_CHUNK_SIZE):
+        """Applies partial updates, each model holding an id and the fields
+        to change, with one UPDATE statement per chunk."""
+        succeeded, errors = 0, []
+        for start in range(0, len(models), chunk_size):
+            chunk = list(enumerate(models[start : start + chunk_size], start))
+            existing = self.get_existing_ids(
+                model["id"] for _, model in chunk if isinstance(model.get("id"), int)
+            )
+
+            changes = {}
+            indexes = {}
+            for index, model in chunk:
+                id = model.get("id")
+                fields = {name: value for name, value in model.items() if name != "id"}
+                error = self.validate(fields, partial=True)
+                if not isinstance(id, int):
+                    error = "Missing id"
+                elif id not in existing:
+                    error = "Not found"
+                elif id in changes:
+                    error = "Duplicate id"
+                if error:
+                    errors.append({"index": index, "id": id if isinstance(id, int) else None, "detail": error})
+                    continue
+                changes[id] = fields
+                indexes[id] = index
+
+            if not changes:
+                continue
+
+            try:
+                self.update_many(changes)
+                succeeded += len(changes)
+            except (DataError, IntegrityError):
+                for id, fields in changes.items():
+                    try:
+                        self.update({**fields, "id": id})
+                        succeeded += 1
+                    except (DataError, IntegrityError) as e:
+                        errors.append({"index": indexes[id], "id": id, "detail": str(e)})
+
+        return {"succeeded": succeeded, "errors": errors}
+
+    def bulk_delete(self, ids: List[int], chunk_size: int = BULK_CHUNK_SIZE):
+        """Deletes the ids with one DELETE statement per chunk."""
+        succeeded, errors = 0, []
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start : start + chunk_size]
+            existing = self.get_existing_ids(chunk)
+
+            to_delete = set()
+            for index, id in enumerate(chunk, start):
+                if id not in existing:
+                    errors.append({"index": index, "id": id, "detail": "Not found"})
+                elif id in to_delete:
+                    errors.append({"index": index, "id": id, "detail": "Duplicate id"})
+                else:
+                    to_delete.add(id)
+
+            if to_delete:
+                self.delete_many(list(to_delete))
+                succeeded += len(to_delete)
+
+        return {"succeeded": succeeded, "errors": errors}
@@ -0,0 +1,153 @@
+import heapq
+from collections import Counter
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from peewee import JOIN, Case, Value, fn
+
+from app.db import get_shard_map, is_mysql, scatter, use_newspaper_shard
+from app.entities.daily_article_count_entity import DailyArticleCountEntity
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+
+
+class DailyArticleCountRepository:
+    """Counts live on the shard of their newspaper. Reads of a newspaper are
+    routed to its shard, add_counts and rebuild work on the current one."""
+
+    def __init__(self):
+        self.entity = DailyArticleCountEntity
+
+    def add_counts(self, deltas: Counter):
+        """Adds each delta to the count of its (newspaper_id, day) pair."""
+        database = self.entity._meta.database
+
+        # MySQL upserts on any unique key, other databases need the target
+        conflict_target = (
+            None
+            if is_mysql(database)
+            else [self.entity.newspaper_id, self.entity.day]
+        )
+
+        for (newspaper_id, day), delta in deltas.items():
+            if delta == 0:
+                continue
+
+            self.entity.insert(newspaper_id=newspaper_id, day=day, count=delta, version=1).on_conflict(
+                conflict_target=conflict_target,
+                update={
+                    self.entity.count: self.entity.count + delta,
+                    self.entity.version: self.entity.version + 1,
+                },
+            ).execute()
+
+    def get_counts_by_day(self, newspaper_id: int, days: Iterable[date]):
+        query = self.entity.select(self.entity.day, self.entity.count).where(
+            (self.entity.newspaper_id == newspaper_id) & (self.entity.day.in_(list(days)))
+        )
+        with use_newspaper_shard(newspaper_id):
+            return {row.day: row.count for row in query}
+
+    def get_counts_between(self, newspaper_id: int, start_date: date, end_date: date):
+        query = self.entity.select(self.entity.day, self.entity.count).where(
+            (self.entity.newspaper_id == newspaper_id)
+            & (self.entity.day >= start_date)
+            & (self.entity.day < end_date)
+        )
+        with use_newspaper_shard(newspaper_id):
+            return {row.day: row.count for row in query}
+
+    def get_daily_counts(
+        self, newspaper_id: int, since: Optional[date] = None
+    ) -> List[Tuple[date, int]]:
+        """Days with at least one article, oldest first, from `since` on if given."""
+        query = (
+            self.entity.select(self.entity.day, self.entity.count)
+            .where((self.entity.newspaper_id == newspaper_id) & (self.entity.count > 0))
+            .order_by(self.entity.day)
+        )
+        if since is not None:
+            query = query.where(self.entity.day >= since)
+        with use_newspaper_shard(newspaper_id):
+            return [(row.day, row.count) for row in query]
+
+    def get_watermark(self, newspaper_id: int) -> Optional[Tuple[date, int, int, Tuple[int, int]]]:
+        """(last day, number of days, number of articles, version) of the
+        daily series of a newspaper, or None if it has no articles. The
+        version, the sum and max of the row versions, changes with any count
+        of the series."""
+        has_articles = self.entity.count > 0
+        query = self.entity.select(
+            fn.MAX(Case(None, [(has_articles, self.entity.day)])),
+            fn.SUM(Case(None, [(has_articles, 1)], 0)),
+            fn.SUM(self.entity.count),
+            fn.SUM(self.entity.version),
+            fn.MAX(self.entity.version),
+        ).where(self.entity.newspaper_id == newspaper_id)
+        with use_newspaper_shard(newspaper_id):
+            row = query.tuples().get()
+        if not row[1]:
+            return None
+        return (self.entity.day.python_value(row[0]), int(row[1]), int(row[2]), (int(row[3]), int(row[4])))
+
+    def get_version(self, newspaper_id: int, before: date) -> Tuple[int, int]:
+        """Version of the days of the series before `before`."""
+        query = self.entity.select(fn.SUM(self.entity.version), fn.MAX(self.entity.version)).where(
+            (self.entity.newspaper_id == newspaper_id) & (self.entity.day < before)
+        )
+        with use_newspaper_shard(newspaper_id):
+            row = query.tuples().get()
+        return (int(row[0] or 0), int(row[1] or 0))
+
+    def get_counts_by_newspaper(
+        self, days: Iterable[date], newspaper_ids: Optional[List[int]] = None
+    ):
+        """(newspaper_id, day, count) tuples of the given days, ordered by
+        newspaper. Newspapers without articles on those days get a single
+        (newspaper_id, None, None) tuple. Gathered from every shard, each one
+        only giving the rows of its own newspapers."""
+        query = (
+            NewspaperEntity.select(NewspaperEntity.id, self.entity.day, self.entity.count)
+            .join(
+                self.entity,
+                JOIN.LEFT_OUTER,
+                on=(
+                    (self.entity.newspaper_id == NewspaperEntity.id)
+                    & (self.entity.day.in_(list(days)))
+                ),
+            )
+            .order_by(NewspaperEntity.id)
+        )
+        if newspaper_ids:
+            query = query.where(NewspaperEntity.id.in_(newspaper_ids))
+
+        shard_map = get_shard_map()
+        if shard_map.count == 1:
+            return list(query.tuples())
+
+        # Every shard has all the newspapers, but only the counts of its own
+        pages = [
+            [row for row in rows if shard_map.shard_for(row[0]) == shard]
+            for shard, rows in enumerate(scatter(lambda: list(query.tuples())))
+        ]
+        return list(heapq.merge(*pages, key=lambda row: row[0]))
+
+    def rebuild(self):
+        """Recomputes every count from the news_articles table."""
+        database = self.entity._meta.database
+        with database.atomic():
+            # Above every previous row version, so the max version of any
+            # rebuilt series differs from the one before
+            version = (self.entity.select(fn.MAX(self.entity.version)).scalar() or 0) + 1
+            articles_by_day = NewsArticleEntity.select(
+                NewsArticleEntity.newspaper_id,
+                NewsArticleEntity.date_uploaded,
+                fn.COUNT(NewsArticleEntity.id),
+                Value(version),
+            ).group_by(NewsArticleEntity.newspaper_id, NewsArticleEntity.date_uploaded)
+
+            self.entity.delete().execute()
+            self.entity.insert_from(
+                articles_by_day,
+                [self.entity.newspaper_id, self.entity.day, self.entity.count, self.entity.version],
+            ).execute()
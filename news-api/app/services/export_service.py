@@ -0,0 +1,329 @@
+import heapq
+import json
+import os
+import shutil
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+from peewee import fn
+
+from app.db import get_db, get_shard_map, is_mysql, scatter, use_shard
+from app.entities.daily_article_count_entity import DailyArticleCountEntity
+from app.entities.news_article_content_entity import NewsArticleContentEntity
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+from app.services.article_content_repository import decompress
+
+EXPORT_CHUNK_SIZE = 10_000  # Rows fetched from the cursor and written per record batch
+
+MANIFEST_FILE = "manifest.json"
+ARTICLES_DIR = "articles"  # id, newspaper_id, title, date_uploaded
+CONTENTS_DIR = "contents"  # id, content
+DAILY_COUNTS_FILE = "daily_counts.arrow"
+NEWSPAPERS_FILE = "newspapers.arrow"
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Exports need pyarrow to be installed")
+    return pyarrow
+
+
+def export_articles(
+    directory: str,
+    full: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+):
+    """Writes the articles to Arrow IPC files, one directory per month of
+    upload, with the content in separate files. The daily counts and the
+    newspapers are written as a whole.
+
+    Articles are exported by id, shard by shard: a new export only writes
+    the articles after each shard's high-water mark of the previous one,
+    updates and deletes of already exported articles are only picked up by
+    a full export.
+    """
+    pa = import_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    manifest = {} if full else read_manifest(directory)
+    if full:
+        for name in (ARTICLES_DIR, CONTENTS_DIR):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    shards_count = get_shard_map().count
+    marks = manifest.get("high_water_marks", [manifest.get("high_water_mark", 0)])
+    marks += [0] * (shards_count - len(marks))
+
+    exported = 0
+    schemas = (articles_schema(pa), contents_schema(pa))
+    for shard in range(shards_count):
+        after_id = marks[shard]
+        writers = {}
+        with use_shard(shard):
+            last_id = NewsArticleEntity.select(fn.MAX(NewsArticleEntity.id)).scalar() or 0
+            try:
+                for rows in stream_articles(after_id, last_id, chunk_size):
+                    for month, columns in group_by_month(rows).items():
+                        if month not in writers:
+                            writers[month] = open_partition(pa, directory, month, shard, after_id)
+                        articles_writer, contents_writer = writers[month]
+                        articles_writer.write_batch(pa.record_batch(columns[:4], schema=schemas[0]))
+                        contents_writer.write_batch(
+                            pa.record_batch([columns[0], columns[4]], schema=schemas[1])
+                        )
+                    exported += len(rows)
+                    if progress:
+                        progress(exported)
+            finally:
+                for writers_pair in writers.values():
+                    for writer in writers_pair:
+                        writer.close()
+        marks[shard] = max(after_id, last_id)
+
+    write_snapshots(pa, directory)
+
+    # Written last, an interrupted export is redone from the same marks
+    manifest = {
+        "high_water_mark": max(marks),
+        "high_water_marks": marks,
+        "articles": manifest.get("articles", 0) + exported,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def stream_articles(after_id: int, last_id: int, chunk_size: int):
+    """Yields chunks of (id, newspaper_id, title, date_uploaded, body) rows
+    with ids in (after_id, last_id], from a single query."""
+    database = get_db()
+    articles = NewsArticleEntity._meta.table_name
+    contents = NewsArticleContentEntity._meta.table_name
+    param = database.param
+    sql = (
+        f"SELECT a.id, a.newspaper_id, a.title, a.date_uploaded, c.body FROM {articles} a "
+        f"LEFT JOIN {contents} c ON c.article_id = a.id "
+        f"WHERE a.id > {param} AND a.id <= {param} ORDER BY a.id"
+    )
+
+    if is_mysql(database):
+        # The default cursor would fetch the whole result before the first row
+        from MySQLdb.cursors import SSCursor
+
+        cursor = database.connection().cursor(SSCursor)
+        cursor.execute(sql, (after_id, last_id))
+    else:
+        # SQLite cursors step through the rows as they are fetched
+        cursor = database.execute_sql(sql, (after_id, last_id))
+
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def group_by_month(rows):
+    """Columns (id, newspaper_id, title, date_uploaded, content) of the rows
+    of each month."""
+    to_date = NewsArticleEntity.date_uploaded.python_value
+    months = {}
+    for id, newspaper_id, title, date_uploaded, body in rows:
+        day = to_date(date_uploaded)
+        columns = months.setdefault(f"{day:%Y-%m}", [[], [], [], [], []])
+        columns[0].append(id)
+        columns[1].append(newspaper_id)
+        columns[2].append(title)
+        columns[3].append(day)
+        columns[4].append(decompress(bytes(body)) if body is not None else None)
+    return months
+
+
+def open_partition(pa, directory: str, month: str, shard: int, after_id: int):
+    """Writers of the articles and contents files of a month, named after
+    the shard and the high-water mark they start from."""
+    writers = []
+    for name, schema in ((ARTICLES_DIR, articles_schema(pa)), (CONTENTS_DIR, contents_schema(pa))):
+        partition = os.path.join(directory, name, f"month={month}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"part-{shard}-{after_id:012d}.arrow")
+        writers.append(pa.ipc.new_file(path, schema))
+    return writers
+
+
+def articles_schema(pa):
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("newspaper_id", pa.int64()),
+            ("title", pa.string()),
+            ("date_uploaded", pa.date32()),
+        ]
+    )
+
+
+def contents_schema(pa):
+    return pa.schema([("id", pa.int64()), ("content", pa.string())])
+
+
+def write_snapshots(pa, directory: str):
+    """Rewrites the daily counts, ordered by newspaper and day, and the
+    newspapers."""
+    query = (
+        DailyArticleCountEntity.select(
+            DailyArticleCountEntity.newspaper_id, DailyArticleCountEntity.day, DailyArticleCountEntity.count
+        )
+        .where(DailyArticleCountEntity.count > 0)
+        .order_by(DailyArticleCountEntity.newspaper_id, DailyArticleCountEntity.day)
+    )
+    # A newspaper's counts are all on one shard
+    counts = list(heapq.merge(*scatter(lambda: list(query.tuples())), key=lambda row: row[0]))
+    newspapers = list(
+        NewspaperEntity.select(NewspaperEntity.id, NewspaperEntity.name).order_by(NewspaperEntity.id).tuples()
+    )
+
+    tables = {
+        DAILY_COUNTS_FILE: pa.table(
+            {
+                "newspaper_id": pa.array([row[0] for row in counts], pa.int64()),
+                "day": pa.array([row[1] for row in counts], pa.date32()),
+                "count": pa.array([row[2] for row in counts], pa.int64()),
+            }
+        ),
+        NEWSPAPERS_FILE: pa.table(
+            {
+                "id": pa.array([row[0] for row in newspapers], pa.int64()),
+                "name": pa.array([row[1] for row in newspapers], pa.string()),
+            }
+        ),
+    }
+    for name, table in tables.items():
+        path = os.path.join(directory, name)
+        with pa.ipc.new_file(path + ".tmp", table.schema) as writer:
+            writer.write_table(table)
+        os.replace(path + ".tmp", path)
+
+
+class ExportedDataset:
+    """Read-only view of an export, with the files memory-mapped.
+
+    Implements the queries of DailyArticleCountRepository used by the
+    statistics, so a RegressionRegistry or get_newspapers_statistics can
+    run on it instead of the database.
+    """
+
+    def __init__(self, directory: str):
+        self.pa = import_pyarrow()
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+
+        counts = self.read_file(os.path.join(directory, DAILY_COUNTS_FILE))
+        self.newspaper_ids = counts["newspaper_id"].to_numpy()
+        self.days = counts["day"].to_numpy()  # datetime64[D]
+        self.counts = counts["count"].to_numpy()
+        self.all_newspaper_ids = self.read_file(os.path.join(directory, NEWSPAPERS_FILE))["id"].to_numpy()
+
+    def read_file(self, path: str):
+        # The table's buffers point into the mapped file, nothing is copied
+        return self.pa.ipc.open_file(self.pa.memory_map(path)).read_all()
+
+    def get_series(self, newspaper_id: int):
+        """Slice of the counts of a newspaper, the rows are sorted by
+        newspaper."""
+        start, end = np.searchsorted(self.newspaper_ids, [newspaper_id, newspaper_id + 1])
+        return slice(start, end)
+
+    def get_daily_counts(self, newspaper_id: int, since: Optional[date] = None):
+        rows = self.get_series(newspaper_id)
+        days, counts = self.days[rows], self.counts[rows]
+        if since is not None:
+            start = np.searchsorted(days, np.datetime64(since, "D"))
+            days, counts = days[start:], counts[start:]
+        return list(zip(days.astype(object), counts.tolist()))
+
+    def get_watermark(self, newspaper_id: int):
+        rows = self.get_series(newspaper_id)
+        if rows.start == rows.stop:
+            return None
+        # The files never change once mapped, the version neither
+        return (self.days[rows.stop - 1].astype(object), rows.stop - rows.start, int(self.counts[rows].sum()), (0, 0))
+
+    def get_version(self, newspaper_id: int, before: date):
+        return (0, 0)
+
+    def get_counts_by_newspaper(self, days: Iterable[date], newspaper_ids: Optional[List[int]] = None):
+        ids = self.all_newspaper_ids
+        if newspaper_ids:
+            ids = ids[np.isin(ids, newspaper_ids)]
+
+        selected = np.isin(self.newspaper_ids, ids) & np.isin(
+            self.days, np.array(list(days), dtype="datetime64[D]")
+        )
+        present = set(self.newspaper_ids[selected].tolist())
+        rows = list(
+            zip(
+                self.newspaper_ids[selected].tolist(),
+                self.days[selected].astype(object),
+                self.counts[selected].tolist(),
+            )
+        )
+        rows += [(id, None, None) for id in ids.tolist() if id not in present]
+        return sorted(rows, key=lambda row: row[0])
+
+    def read_articles(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Articles uploaded between `start` and `end`, both included."""
+        table = self.read_partitions(ARTICLES_DIR, articles_schema(self.pa), start, end)
+        if start is None and end is None:
+            return table
+
+        import pyarrow.compute as pc
+
+        date32 = self.pa.date32()
+        return table.filter(
+            pc.and_(
+                pc.greater_equal(table["date_uploaded"], self.pa.scalar(start or date.min, date32)),
+                pc.less_equal(table["date_uploaded"], self.pa.scalar(end or date.max, date32)),
+            )
+        )
+
+    def read_contents(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Contents of the articles uploaded between `start` and `end`."""
+        table = self.read_partitions(CONTENTS_DIR, contents_schema(self.pa), start, end)
+        if start is None and end is None:
+            return table
+
+        import pyarrow.compute as pc
+
+        ids = self.read_articles(start, end)["id"]
+        return table.filter(pc.is_in(table["id"], value_set=ids.combine_chunks()))
+
+    def read_partitions(self, name: str, schema, start: Optional[date], end: Optional[date]):
+        """Files of the months overlapping the dates, as a single table."""
+        directory = os.path.join(self.directory, name)
+        first = f"month={start:%Y-%m}" if start else ""
+        last = f"month={end:%Y-%m}" if end else "~"
+
+        tables = []
+        partitions = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+        for partition in partitions:
+            if not first <= partition <= last:
+                continue
+            for file_name in sorted(os.listdir(os.path.join(directory, partition))):
+                tables.append(self.read_file(os.path.join(directory, partition, file_name)))
+        return self.pa.concat_tables(tables) if tables else schema.empty_table()
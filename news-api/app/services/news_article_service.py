@@ -0,0 +1,292 @@
+import heapq
+from collections import Counter
+from itertools import islice
+from typing import Iterable
+
+from peewee import IntegrityError
+
+from app.cache import article_tags, get_cache
+from app.db import scatter, use_shard
+from app.entities.news_article_entity import NewsArticleEntity
+from app.services.article_content_repository import ArticleContentRepository
+from app.services.article_search_repository import ArticleSearchRepository
+from app.services.base_service import BaseService
+from app.services.daily_article_count_repository import DailyArticleCountRepository
+from app.services.regression_service import get_regression_registry
+
+
+# Fields deciding which daily count an article is part of
+COUNTED_FIELDS = {"newspaper_id", "date_uploaded"}
+
+# Fields kept in the search index
+INDEXED_FIELDS = {"title", "content"}
+
+
+class NewsArticleService(BaseService):
+    """Article writes also update the daily_article_counts rollup, the
+    compressed contents and the search index, in the same transaction.
+
+    The content is not a column of news_articles: it is only loaded for a
+    single article, or for a list when asked for explicitly.
+
+    Articles, with their contents, index entries and daily counts, live on
+    the shard of their newspaper. Writes spanning several shards commit one
+    transaction per shard.
+    """
+
+    def __init__(self):
+        BaseService.__init__(self, NewsArticleEntity, "newspaper_id")
+        self.daily_counts = DailyArticleCountRepository()
+        self.contents = ArticleContentRepository()
+        self.search_index = ArticleSearchRepository()
+
+    def get_all(self, after_id=None, limit=None, fields=None):
+        if not fields or "content" not in fields:
+            return BaseService.get_all(self, after_id, limit, fields)
+
+        columns = [name for name in fields if name != "content"] or ["id"]
+        rows = BaseService.get_all(self, after_id, limit, columns)
+        contents = {}
+        for ids in self.group_ids(row["id"] for row in rows).values():
+            with self.use_shard_of_id(ids[0]):
+                contents.update(self.contents.get_many(ids))
+        for row in rows:
+            row["content"] = contents.get(row["id"])
+        return rows
+
+    def get_by_id(self, id: int):
+        with self.use_shard_of_id(id):
+            article = self.repository.get_by_id(id)
+            if article is not None:
+                article.content = self.contents.get(id)
+        return article
+
+    def validate(self, model: dict, partial: bool = False):
+        error = BaseService.validate(self, without_content(model), partial)
+        if error:
+            return error
+        if "content" in model and model["content"] is None:
+            return "Field 'content' can't be null"
+        if not partial and "content" not in model:
+            return "Missing field 'content'"
+        return None
+
+    def create(self, model):
+        content = model.get("content")
+        if content is None:
+            raise IntegrityError("Missing field 'content'")
+
+        with use_shard(self.shard_for(model)), self.repository.atomic():
+            article = BaseService.create(self, without_content(model))
+            self.contents.save_many({article.id: content})
+            self.search_index.index_many([{"id": article.id, "title": article.title, "content": content}])
+            changes = self.record_changes(added=[article])
+        self.invalidate_cache(changes)
+        article.content = content
+        return article
+
+    def create_many(self, models):
+        if any(model.get("content") is None for model in models):
+            raise IntegrityError("Missing field 'content'")
+
+        ids = [None] * len(models)
+        changes = []
+        try:
+            for shard, indexes in self.group_models(models).items():
+                group = [models[index] for index in indexes]
+                with use_shard(shard), self.repository.atomic():
+                    group_ids = BaseService.create_many(self, [without_content(model) for model in group])
+                    self.contents.save_many({id: model["content"] for id, model in zip(group_ids, group)})
+                    self.search_index.index_many(
+                        {"id": id, "title": model["title"], "content": model["content"]}
+                        for id, model in zip(group_ids, group)
+                    )
+                    changes += self.record_changes(
+                        added=[NewsArticleEntity(**model) for model in group]
+                    )
+                for index, id in zip(indexes, group_ids):
+                    ids[index] = id
+        finally:
+            # Shards committed before a failing one keep their articles
+            self.invalidate_cache(changes)
+        return ids
+
+    def update(self, model):
+        content = model.get("content")
+        self.check_shard_key(model["id"], model)
+        with self.use_shard_of_id(model["id"]), self.repository.atomic():
+            existing = self.repository.get_by_id(model["id"])
+            if existing is None:
+                return None
+
+            previous = NewsArticleEntity(**existing.__data__)
+            for key, value in without_content(model).items():
+                existing.__data__[key] = value
+            existing.save()
+
+            previous_content = self.contents.get(existing.id)
+            if content is not None:
+                self.contents.save_many({existing.id: content})
+            else:
+                content = previous_content
+            if INDEXED_FIELDS & model.keys():
+                self.search_index.remove_many(
+                    [{"id": existing.id, "title": previous.title, "content": previous_content}]
+                )
+                self.search_index.index_many(
+                    [{"id": existing.id, "title": existing.title, "content": content}]
+                )
+
+            changes = self.record_changes(added=[existing], removed=[previous])
+        self.invalidate_cache(changes)
+        existing.content = content
+        return existing
+
+    def delete(self, id: int):
+        with self.use_shard_of_id(id), self.repository.atomic():
+            existing = self.get_by_id(id)
+            if existing is None:
+                return False
+
+            # The content row is deleted by the foreign key
+            is_deleted = BaseService.delete(self, id)
+            self.search_index.remove_many(
+                [{"id": id, "title": existing.title, "content": existing.content}]
+            )
+            changes = self.record_changes(removed=[existing])
+        self.invalidate_cache(changes)
+        return is_deleted
+
+    def update_many(self, changes):
+        for id, fields in changes.items():
+            self.check_shard_key(id, fields)
+
+        updated, counts_changes = 0, []
+        try:
+            for ids in self.group_ids(changes).values():
+                with self.use_shard_of_id(ids[0]), self.repository.atomic():
+                    group_updated, group_changes = self.update_group({id: changes[id] for id in ids})
+                updated += group_updated
+                counts_changes += group_changes
+        finally:
+            self.invalidate_cache(counts_changes)
+        return updated
+
+    def update_group(self, changes):
+        """Updates articles of the current shard, returns the number of
+        updated articles and the changed (newspaper_id, day) pairs."""
+        # The counts only move when an article changes newspaper or day, the
+        # index when its text changes
+        moved = [id for id, fields in changes.items() if COUNTED_FIELDS & fields.keys()]
+        reindexed = [id for id, fields in changes.items() if INDEXED_FIELDS & fields.keys()]
+        contents = {
+            id: fields["content"] for id, fields in changes.items() if "content" in fields
+        }
+        previous = self.repository.get_many(moved, list(COUNTED_FIELDS)) if moved else []
+        indexed = self.get_indexed(reindexed)
+
+        columns = {id: without_content(fields) for id, fields in changes.items()}
+        updated = BaseService.update_many(
+            self, {id: fields for id, fields in columns.items() if fields}
+        )
+        self.contents.save_many(contents)
+        self.search_index.remove_many(indexed)
+        self.search_index.index_many(
+            {**row, **{name: value for name, value in changes[row["id"]].items() if name in INDEXED_FIELDS}}
+            for row in indexed
+        )
+
+        counts_changes = self.record_changes(
+            added=[
+                NewsArticleEntity(**{**article.__data__, **changes[article.id]})
+                for article in previous
+            ],
+            removed=previous,
+        )
+        return updated, counts_changes
+
+    def delete_many(self, ids):
+        deleted, changes = 0, []
+        try:
+            for group in self.group_ids(ids).values():
+                with self.use_shard_of_id(group[0]), self.repository.atomic():
+                    previous = self.repository.get_many(group, list(COUNTED_FIELDS))
+                    indexed = self.get_indexed(group)
+                    deleted += BaseService.delete_many(self, group)
+                    self.search_index.remove_many(indexed)
+                    changes += self.record_changes(removed=previous)
+        finally:
+            self.invalidate_cache(changes)
+        return deleted
+
+    def get_indexed(self, ids):
+        """Id, title and content of the articles, as they are indexed."""
+        if not ids:
+            return []
+        contents = self.contents.get_many(ids)
+        return [
+            {"id": article.id, "title": article.title, "content": contents[article.id]}
+            for article in self.repository.get_many(ids, ["title"])
+        ]
+
+    def search(self, terms, newspaper_id=None, start_date=None, end_date=None, after=None, limit=20):
+        args = (terms, newspaper_id, start_date, end_date, after, limit)
+        if not self.is_sharded():
+            return self.search_index.search(*args)
+        if newspaper_id is not None:
+            with use_shard(self.shards.shard_for(newspaper_id)):
+                return self.search_index.search(*args)
+
+        # Scores are ranked within each shard, merged they are comparable but
+        # not exactly what a single index would give
+        pages = scatter(self.search_index.search, *args)
+        return list(islice(heapq.merge(*pages, key=lambda row: (row["score"], row["id"])), limit))
+
+    def get_daily_counts(self, newspaper_id: int, since=None):
+        return self.daily_counts.get_daily_counts(newspaper_id, since)
+
+    def get_counts_by_day(self, newspaper_id: int, days):
+        return self.daily_counts.get_counts_by_day(newspaper_id, days)
+
+    def get_counts_between(self, newspaper_id: int, start_date, end_date):
+        return self.daily_counts.get_counts_between(newspaper_id, start_date, end_date)
+
+    def get_counts_by_newspaper(self, days, newspaper_ids=None):
+        return self.daily_counts.get_counts_by_newspaper(days, newspaper_ids)
+
+    def record_changes(self, added: Iterable = (), removed: Iterable = ()):
+        """Updates the derived data for added and removed articles. Returns
+        the changed (newspaper_id, day) pairs."""
+        deltas = Counter()
+        for article in added:
+            deltas[day_key(article)] += 1
+        for article in removed:
+            deltas[day_key(article)] -= 1
+
+        self.daily_counts.add_counts(deltas)
+        return list(deltas)
+
+    def invalidate_cache(self, changes):
+        # Called once the transaction is committed, so the cache can't be
+        # refilled with the data from before the write
+        tags = []
+        for newspaper_id, day in changes:
+            tags += article_tags(newspaper_id, [day]) + article_tags(None, [day])
+        get_cache().invalidate(tags)
+        get_regression_registry().invalidate(changes)
+
+
+def without_content(model: dict):
+    return {name: value for name, value in model.items() if name != "content"}
+
+
+def day_key(article):
+    date_uploaded = NewsArticleEntity.date_uploaded.python_value(article.date_uploaded)
+    return (int(article.newspaper_id), date_uploaded)
+
+
+service = NewsArticleService()
+
+
+def get_news_article_service() -> NewsArticleService:
+    return service
@@ -0,0 +1,91 @@
+from itertools import islice
+from typing import Dict, List
+
+from app.cache import get_cache, newspapers_tags
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+from app.services.base_service import BULK_CHUNK_SIZE, BaseService
+from app.services.news_article_service import day_key, get_news_article_service
+from app.services.regression_service import get_regression_registry
+
+
+class NewspaperService(BaseService):
+    """Deleting a newspaper deletes its articles through the foreign keys,
+    which don't reach the search index: the index entries of the articles
+    are removed in the same transaction, as the article deletes do, and
+    the cached reports of the newspaper are invalidated.
+
+    Every write invalidates the cached values listing the newspapers.
+    """
+
+    def __init__(self):
+        BaseService.__init__(self, NewspaperEntity)
+        self.articles = get_news_article_service()
+
+    def create(self, model):
+        try:
+            return BaseService.create(self, model)
+        finally:
+            self.invalidate_cache()
+
+    def create_many(self, models: List[dict]):
+        try:
+            return BaseService.create_many(self, models)
+        finally:
+            self.invalidate_cache()
+
+    def update(self, model):
+        try:
+            return BaseService.update(self, model)
+        finally:
+            self.invalidate_cache()
+
+    def update_many(self, changes: Dict[int, dict]):
+        try:
+            return BaseService.update_many(self, changes)
+        finally:
+            self.invalidate_cache()
+
+    def delete(self, id: int):
+        return self.delete_many([id]) > 0
+
+    def delete_many(self, ids: List[int]):
+        changes = []
+        try:
+            deleted = self.on_shards_of(ids, lambda group: self.delete_group(group, changes))
+        finally:
+            self.articles.invalidate_cache(changes)
+            self.invalidate_cache()
+            for id in ids:
+                get_regression_registry().discard(id)
+        return deleted
+
+    def delete_group(self, ids: List[int], changes: list):
+        """Deletes newspapers of the current shard with their articles, adds
+        the (newspaper_id, day) pairs of the articles to `changes`."""
+        query = NewsArticleEntity.select(
+            NewsArticleEntity.id, NewsArticleEntity.newspaper_id, NewsArticleEntity.date_uploaded
+        ).where(NewsArticleEntity.newspaper_id.in_(ids))
+
+        with self.repository.atomic():
+            articles = list(query)
+            # Removed before the cascade deletes the contents the index
+            # entries are removed with
+            article_ids = iter([article.id for article in articles])
+            while chunk := list(islice(article_ids, BULK_CHUNK_SIZE)):
+                self.articles.search_index.remove_many(self.articles.get_indexed(chunk))
+
+            deleted = self.repository.delete_many(ids)
+        changes += {day_key(article) for article in articles}
+        return deleted
+
+    def invalidate_cache(self):
+        # Called once the write is committed, like the article writes do
+        get_cache().invalidate(newspapers_tags())
+
+
+service = NewspaperService()
+
+
+def get_newspaper_service() -> NewspaperService:
+    return service
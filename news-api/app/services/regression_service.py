@@ -0,0 +1,181 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.daily_article_count_repository import DailyArticleCountRepository
+
+REGRESSION_MAX_MODELS = int(os.getenv("REGRESSION_MAX_MODELS", "1000"))  # Models kept before evicting the least recently used
+
+
+class RegressionModel:
+    """Least-squares line through the daily article counts of a newspaper.
+
+    The fit is kept as exact integer sums over the (day, count) points, so a
+    day can be added, changed or removed without refitting the whole series.
+    Days are counted from `origin` to keep the sums small.
+    """
+
+    def __init__(self, origin: date):
+        self.origin = origin
+        self.series = {}  # day -> count
+        self.n = self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = self.sum_yy = 0
+
+    @classmethod
+    def fit(cls, rows: List[Tuple[date, int]]):
+        """Fits the (day, count) rows at once, with NumPy."""
+        model = cls(rows[0][0])
+        x = np.fromiter((day.toordinal() for day, _ in rows), dtype=np.int64, count=len(rows))
+        x -= model.origin.toordinal()
+        y = np.fromiter((count for _, count in rows), dtype=np.int64, count=len(rows))
+
+        model.series = dict(rows)
+        model.n = len(rows)
+        model.sum_x = int(x.sum())
+        model.sum_y = int(y.sum())
+        model.sum_xx = int((x * x).sum())
+        model.sum_xy = int((x * y).sum())
+        model.sum_yy = int((y * y).sum())
+        return model
+
+    def copy(self):
+        model = RegressionModel(self.origin)
+        model.series = dict(self.series)
+        model.n, model.sum_x, model.sum_y = self.n, self.sum_x, self.sum_y
+        model.sum_xx, model.sum_xy, model.sum_yy = self.sum_xx, self.sum_xy, self.sum_yy
+        return model
+
+    def set_count(self, day: date, count: int):
+        """Replaces the count of a day, 0 removes the day from the series."""
+        x = (day - self.origin).days
+        for sign, value in ((-1, self.series.pop(day, 0)), (1, count)):
+            if value:
+                self.n += sign
+                self.sum_x += sign * x
+                self.sum_y += sign * value
+                self.sum_xx += sign * x * x
+                self.sum_xy += sign * x * value
+                self.sum_yy += sign * value * value
+        if count:
+            self.series[day] = count
+
+    def update(self, rows: Iterable[Tuple[date, int]], since: date):
+        """Replaces the series from `since` on by the given rows."""
+        rows = dict(rows)
+        for day in [day for day in self.series if day >= since and day not in rows]:
+            self.set_count(day, 0)
+        for day, count in rows.items():
+            self.set_count(day, count)
+
+    @property
+    def watermark(self) -> Optional[Tuple[date, int, int]]:
+        if not self.n:
+            return None
+        return (max(self.series), self.n, self.sum_y)
+
+    @property
+    def slope(self) -> float:
+        # Needs two distinct days
+        return (self.n * self.sum_xy - self.sum_x * self.sum_y) / (
+            self.n * self.sum_xx - self.sum_x * self.sum_x
+        )
+
+    @property
+    def intercept(self) -> float:
+        return (self.sum_y - self.slope * self.sum_x) / self.n
+
+    @property
+    def mean(self) -> float:
+        return self.sum_y / self.n
+
+    @property
+    def std_dev(self) -> float:
+        # Population standard deviation of the counts, like np.std
+        return (self.n * self.sum_yy - self.sum_y * self.sum_y) ** 0.5 / self.n
+
+    def predict(self, days: Iterable[date]):
+        x = np.fromiter((day.toordinal() for day in days), dtype=float)
+        return self.intercept + self.slope * (x - self.origin.toordinal())
+
+    def simulate(self, simulations: int, seed: Optional[int] = None):
+        """Monte Carlo draws of the series around the fitted line: one row of
+        counts per simulation, one column per day of the series."""
+        rng = np.random.default_rng(seed)
+        loc = self.predict(self.series)
+        return rng.normal(loc=loc, scale=self.std_dev, size=(simulations, len(loc)))
+
+
+class RegressionRegistry:
+    """Fitted models by newspaper, reused while the data watermark of the
+    newspaper (last day, days, articles and version of its daily series) is
+    unchanged. The version moves with every count written, so the models of
+    other workers notice changes that keep the other three values.
+
+    When the watermark moved but the days before the last fitted one kept
+    their version, the days from the last fitted one on are read again and
+    applied to the model; otherwise the series is refitted from scratch.
+    The least recently used models are evicted past `max_models`.
+    """
+
+    def __init__(self, daily_counts: DailyArticleCountRepository, max_models: int = REGRESSION_MAX_MODELS):
+        self.daily_counts = daily_counts
+        self.max_models = max_models
+        self.lock = threading.Lock()
+        self.models = OrderedDict()  # newspaper_id -> (model, watermark, version of the days before its last one)
+
+    def get_model(self, newspaper_id: int) -> Optional[RegressionModel]:
+        """Runs queries, call it from the database executor."""
+        watermark = self.daily_counts.get_watermark(newspaper_id)
+        with self.lock:
+            entry = self.models.get(newspaper_id)
+            if entry is not None:
+                self.models.move_to_end(newspaper_id)
+
+        if watermark is None:
+            self.discard(newspaper_id)
+            return None
+        if entry is not None and entry[1] == watermark:
+            return entry[0]
+
+        model = None
+        if entry is not None and watermark[0] >= entry[1][0]:
+            since = entry[1][0]
+            if self.daily_counts.get_version(newspaper_id, since) == entry[2]:
+                model = entry[0].copy()
+                model.update(self.daily_counts.get_daily_counts(newspaper_id, since), since)
+                if model.watermark != watermark[:3]:
+                    model = None
+
+        if model is None:
+            model = RegressionModel.fit(self.daily_counts.get_daily_counts(newspaper_id))
+
+        version = self.daily_counts.get_version(newspaper_id, watermark[0])
+        with self.lock:
+            self.models[newspaper_id] = (model, watermark, version)
+            self.models.move_to_end(newspaper_id)
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+        return model
+
+    def invalidate(self, changes: Iterable[Tuple[int, date]]):
+        """Drops the models covering the changed (newspaper_id, day) pairs.
+        Days after the last fitted one are picked up by the watermark."""
+        with self.lock:
+            for newspaper_id, day in changes:
+                entry = self.models.get(newspaper_id)
+                if entry is not None and day < entry[1][0]:
+                    del self.models[newspaper_id]
+
+    def discard(self, newspaper_id: int):
+        with self.lock:
+            self.models.pop(newspaper_id, None)
+
+
+registry = RegressionRegistry(DailyArticleCountRepository())
+
+
+def get_regression_registry() -> RegressionRegistry:
+    return registry
@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from faker import Faker
+
+from app.executor import run_in_db
+from app.models.seed_job import SeedJob
+from app.services.news_article_service import get_news_article_service
+from app.services.newspaper_service import get_newspaper_service
+
+ARTICLE_FIELDS = ("newspaper_id", "title", "content", "date_uploaded")
+
+# Seeding jobs started from the API, by id, in the order they were created
+seed_jobs: Dict[str, SeedJob] = {}
+
+SEED_JOBS_KEPT = 100  # Finished jobs kept for polling, the oldest are forgotten
+
+
+def generate_articles(
+    newspaper_ids: List[int],
+    articles_count: int,
+    seed: Optional[int] = None,
+    first_index: int = 0,
+):
+    """Yields fake (newspaper_id, title, content, date_uploaded) tuples.
+
+    With a seed, the articles of the n-th newspaper only depend on
+    `seed + n`, so the output is the same however the newspapers are split
+    between processes.
+    """
+    fake = Faker()
+    for index, newspaper_id in enumerate(newspaper_ids, start=first_index):
+        if seed is not None:
+            fake.seed_instance(seed + index)
+
+        for _ in range(articles_count):
+            yield (
+                newspaper_id,
+                fake.sentence(),
+                fake.paragraph(nb_sentences=50),
+                # Random date uploaded (past 180 days)
+                fake.date_between(start_date="-183d", end_date="today"),
+            )
+
+
+def generate_articles_chunk(newspaper_ids, articles_count, seed, first_index):
+    return list(generate_articles(newspaper_ids, articles_count, seed, first_index))
+
+
+def generate_articles_parallel(
+    newspaper_ids: List[int], articles_count: int, seed: Optional[int], workers: int
+):
+    """Same as generate_articles, with the content of each newspaper
+    generated in a worker process. At most two newspapers per worker are
+    kept in memory ahead of the consumer.
+
+    The workers are spawned, not forked: a fork would copy the pooled
+    connections and locks of the calling process."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        for index, newspaper_id in enumerate(newspaper_ids):
+            pending.append(
+                pool.submit(
+                    generate_articles_chunk, [newspaper_id], articles_count, seed, index
+                )
+            )
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def batched(rows: Iterable, batch_size: int):
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def create_newspapers(newspapers_count: int, seed: Optional[int] = None) -> List[int]:
+    fake = Faker()
+    if seed is not None:
+        fake.seed_instance(seed)
+
+    # Through the service, which copies the newspapers to every shard
+    service = get_newspaper_service()
+    newspapers = [{"name": fake.company(), "email": fake.email()} for _ in range(newspapers_count)]
+    return [id for batch in batched(newspapers, 1000) for id in service.create_many(batch)]
+
+
+def seed_newspapers_articles(
+    newspapers_count: int,
+    articles_count: int,
+    batch_size: int = 1000,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+):
+    """Creates fake newspapers with `articles_count` articles each.
+
+    Articles are inserted with one INSERT per batch, each batch in its own
+    transaction. `progress` is called after every batch with the number of
+    newspapers and articles created so far.
+    """
+    newspaper_ids = create_newspapers(newspapers_count, seed)
+    if progress:
+        progress(len(newspaper_ids), 0)
+
+    service = get_news_article_service()
+    articles_created = 0
+    for batch in batched(make_articles(newspaper_ids, articles_count, seed, workers), batch_size):
+        service.create_many([dict(zip(ARTICLE_FIELDS, row)) for row in batch])
+        articles_created += len(batch)
+        if progress:
+            progress(len(newspaper_ids), articles_created)
+
+    return len(newspaper_ids), articles_created
+
+
+def make_articles(newspaper_ids: List[int], articles_count: int, seed: Optional[int], workers: int):
+    if workers > 1:
+        return generate_articles_parallel(newspaper_ids, articles_count, seed, workers)
+    return generate_articles(newspaper_ids, articles_count, seed)
+
+
+def create_seed_job(newspapers_count: int, articles_count: int) -> SeedJob:
+    job = SeedJob(
+        id=uuid4().hex,
+        status="queued",
+        newspapers_count=newspapers_count,
+        articles_count=articles_count,
+    )
+    seed_jobs[job.id] = job
+
+    finished = [id for id, job in seed_jobs.items() if job.finished_at is not None]
+    for id in finished[: max(len(finished) - SEED_JOBS_KEPT, 0)]:
+        del seed_jobs[id]
+    return job
+
+
+async def run_seed_job(
+    job: SeedJob, batch_size: int = 1000, workers: int = 1, seed: Optional[int] = None
+):
+    """Runs a seeding job like seed_newspapers_articles. Each write is its own
+    job on the database executor, so a long seeding doesn't hold a worker;
+    the articles are generated in a separate thread meanwhile."""
+    job.status = "running"
+    job.started_at = datetime.now()
+    generated = None
+    try:
+        newspaper_ids = await run_in_db(create_newspapers, job.newspapers_count, seed)
+        job.newspapers_created = len(newspaper_ids)
+
+        service = get_news_article_service()
+        generated = make_articles(newspaper_ids, job.articles_count, seed, workers)
+        articles = batched(generated, batch_size)
+        while batch := await asyncio.to_thread(next, articles, None):
+            await run_in_db(service.create_many, [dict(zip(ARTICLE_FIELDS, row)) for row in batch])
+            job.articles_created += len(batch)
+        job.status = "finished"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        if generated is not None:
+            # Stops the worker processes of a failed job
+            await asyncio.to_thread(generated.close)
+        job.finished_at = datetime.now()
+
+
+def get_seed_job(job_id: str) -> Optional[SeedJob]:
+    return seed_jobs.get(job_id)
@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from app.services.news_article_service import get_news_article_service
+from app.services.regression_service import RegressionModel
+
+EXPECTED_MEAN = 100  # Replace with your expected value
+EXPECTED_STD_DEV = 15  # Replace with your expected value
+THRESHOLD_RATIO = 0.8  # Threshold of 80%
+AVERAGE_TOLERANCE = 0.1  # Relative tolerance of the regression check
+EXPECTED_COUNTS = [50, 100, 150]  # Example expected counts of the canonical analysis
+WINDOW_DAYS = 180  # Days compared across newspapers by default
+
+
+def get_counts(model: RegressionModel):
+    """Daily counts of the model's series, oldest day first."""
+    return np.array([count for _, count in sorted(model.series.items())], dtype=np.int64)
+
+
+def central_tendency(counts):
+    mean_calculated = float(counts.mean())
+    return {
+        "calculated_mean": mean_calculated,
+        "expected_mean": EXPECTED_MEAN,
+        "is_mean_correct": mean_calculated < (EXPECTED_MEAN * THRESHOLD_RATIO),
+    }
+
+
+def dispersion(counts):
+    # The sample standard deviation needs two days
+    std_dev_calculated = float(counts.std(ddof=1)) if len(counts) > 1 else None
+    return {
+        "calculated_std_dev": std_dev_calculated,
+        "expected_std_dev": EXPECTED_STD_DEV,
+        "is_std_dev_correct": std_dev_calculated is not None
+        and std_dev_calculated < (EXPECTED_STD_DEV * THRESHOLD_RATIO),
+    }
+
+
+def regression(model: RegressionModel, simulations: int, seed: Optional[int] = None):
+    """Monte Carlo check of the fitted trend, None with less than two days."""
+    if model.n < 2:
+        return None
+
+    expected_value = float(model.simulate(simulations, seed).mean())
+    calculated_average = model.mean
+    return {
+        "expected_value": expected_value,
+        "calculated_average": calculated_average,
+        "is_average_matching": bool(
+            np.isclose(expected_value, calculated_average, rtol=AVERAGE_TOLERANCE)
+        ),
+    }
+
+
+def canonical(counts):
+    # Canonical analysis with dummy class labels
+    expected = np.array(EXPECTED_COUNTS)
+    probabilities = lda_probabilities(counts, np.zeros_like(counts), expected)
+    return {
+        "expected_count": expected.tolist(),
+        "observed_count": counts.tolist(),
+        "probabilities": probabilities.tolist(),
+    }
+
+
+def lda_probabilities(values, labels, points):
+    """Posterior class probabilities of `points` under a one-feature linear
+    discriminant analysis of `values`: one row per point, one column per
+    class in sorted label order."""
+    classes, label_indexes = np.unique(labels, return_inverse=True)
+    if len(classes) == 1:
+        return np.ones((len(points), 1))
+
+    values = values.astype(float)
+    sizes = np.bincount(label_indexes)
+    means = np.bincount(label_indexes, weights=values) / sizes
+    priors = sizes / len(values)
+    variance = ((values - means[label_indexes]) ** 2).sum() / (len(values) - len(classes))
+
+    # Linear discriminant of each class at each point, then softmax
+    points = np.asarray(points, dtype=float)[:, None]
+    scores = points * means / variance - means**2 / (2 * variance) + np.log(priors)
+    scores -= scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def summarize(model: RegressionModel, simulations: int, seed: Optional[int] = None):
+    """Every statistical test over the same daily series."""
+    counts = get_counts(model)
+    return {
+        "central_tendency": central_tendency(counts),
+        "dispersion": dispersion(counts),
+        "regression": regression(model, simulations, seed),
+        "canonical": canonical(counts),
+    }
+
+
+def get_window(today: date, days: int) -> List[date]:
+    """The `days` complete days before today, oldest first."""
+    return [today - timedelta(days=days - i) for i in range(days)]
+
+
+def get_newspapers_statistics(
+    today: date, days: int = WINDOW_DAYS, newspaper_ids: Optional[List[int]] = None, source=None
+):
+    """Statistics of the daily series of every newspaper (or the given ones)
+    over the window, from a single query. Returns one NumPy column per
+    statistic, one row per newspaper ordered by id.
+
+    `source` has the counts, the database by default or an ExportedDataset.
+    """
+    window = get_window(today, days)
+    source = source or get_news_article_service()
+    rows = source.get_counts_by_newspaper(window, newspaper_ids)
+
+    ids = np.unique(np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+    present = [row for row in rows if row[2]]
+    newspapers = np.searchsorted(ids, [row[0] for row in present]).astype(np.int64)
+    columns = np.fromiter((row[1].toordinal() for row in present), dtype=np.int64, count=len(present))
+
+    # Newspapers x days, days without articles count as 0
+    counts = np.zeros((len(ids), days), dtype=np.int64)
+    counts[newspapers, columns - window[0].toordinal()] = [row[2] for row in present]
+
+    return {"newspaper_id": ids, **compute_statistics(counts)}
+
+
+def compute_statistics(counts: np.ndarray):
+    """Total, mean, sample standard deviation and least-squares trend (articles
+    per day) of each row of `counts`, computed for all rows at once."""
+    days = counts.shape[1]
+
+    # Centered day numbers, the slope is then a single matrix product
+    x = np.arange(days) - (days - 1) / 2
+    return {
+        "total": counts.sum(axis=1),
+        "mean": counts.mean(axis=1),
+        "std_dev": counts.std(axis=1, ddof=1),
+        "slope": counts @ x / (x @ x),
+    }
@@ -0,0 +1,73 @@
+import heapq
+from datetime import date, datetime
+from operator import itemgetter
+from typing import List, Optional
+
+from peewee import fn
+
+from app.db import get_shard_map, is_mysql, scatter, use_newspaper_shard, use_shard
+from app.entities.verification_entity import VerificationEntity
+
+VERDICT_FIELDS = ("newspaper_id", "status", "today_count", "threshold", "message")
+
+
+class VerificationRepository:
+    """Verdicts live on the shard of their newspaper."""
+
+    def __init__(self):
+        self.entity = VerificationEntity
+
+    def save_many(self, day: date, verdicts: List[dict]):
+        """Stores the verdicts of a day, replacing those of a previous run."""
+        if not verdicts:
+            return
+        verified_at = datetime.now()
+        rows = [
+            {**{name: verdict.get(name) for name in VERDICT_FIELDS}, "day": day, "verified_at": verified_at}
+            for verdict in verdicts
+        ]
+
+        # MySQL upserts on any unique key, other databases need the target
+        database = self.entity._meta.database
+        conflict_target = (
+            None
+            if is_mysql(database)
+            else [self.entity.newspaper_id, self.entity.day]
+        )
+        updated = [
+            self.entity.status,
+            self.entity.today_count,
+            self.entity.threshold,
+            self.entity.message,
+            self.entity.verified_at,
+        ]
+        shard_map = get_shard_map()
+        shards = {}
+        for row in rows:
+            shards.setdefault(shard_map.shard_for(row["newspaper_id"]), []).append(row)
+        for shard, shard_rows in shards.items():
+            with use_shard(shard):
+                self.entity.insert_many(shard_rows).on_conflict(
+                    conflict_target=conflict_target, preserve=updated
+                ).execute()
+
+    def get_by_day(self, day: Optional[date] = None, newspaper_id: Optional[int] = None):
+        """Verdicts of a day, the last verified one by default, as dicts
+        ordered by newspaper."""
+        if day is None:
+            last_days = [day for day in scatter(self.entity.select(fn.MAX(self.entity.day)).scalar) if day]
+            if not last_days:
+                return []
+            day = max(last_days)
+
+        query = (
+            self.entity.select()
+            .where(self.entity.day == day)
+            .order_by(self.entity.newspaper_id)
+        )
+        if newspaper_id is not None:
+            query = query.where(self.entity.newspaper_id == newspaper_id)
+            with use_newspaper_shard(newspaper_id):
+                return list(query.dicts())
+        pages = scatter(lambda: list(query.dicts()))
+        return list(heapq.merge(*pages, key=itemgetter("newspaper_id")))
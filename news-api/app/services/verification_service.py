@@ -0,0 +1,212 @@
+from datetime import date, datetime, time, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import List, Optional
+
+import numpy as np
+
+from app.cache import CACHE_TTL, article_tags, get_cache
+from app.services.news_article_service import get_news_article_service
+from app.services.verification_repository import VerificationRepository
+
+HISTORY_DAYS = 6 * 30  # Approximation of 6 months
+THRESHOLD_RATIO = 0.8  # Today's count is expected to be at least 80% of the average
+HIGH_CV = 0.5  # Arbitrary threshold for high variability
+
+# Verdicts of a count below what is expected, which are notified
+ALERT_STATUSES = {"below_q1", "differs_from_most_frequent"}
+
+# Newspapers verified per NumPy pass by iter_verdicts
+VERIFY_CHUNK_SIZE = 1000
+
+
+def get_same_weekday_dates(today: date) -> List[date]:
+    """Days with the same weekday as today over the last 6 months, excluding
+    today. Listing the dates keeps the queries sargable, WEEKDAY(date_uploaded)
+    can't use an index."""
+    six_months_ago = today - timedelta(days=HISTORY_DAYS)
+    return [
+        today - timedelta(weeks=week)
+        for week in range(1, (today - six_months_ago).days // 7 + 1)
+    ]
+
+
+def get_baseline_ttl() -> int:
+    # Baselines end yesterday, they stay valid until the date changes. A
+    # per-process cache only sees the writes of its own worker, the others
+    # must not keep a stale baseline longer than any other report
+    now = datetime.now()
+    ttl = int((datetime.combine(now.date() + timedelta(days=1), time()) - now).total_seconds()) + 1
+    return ttl if get_cache().shared else min(ttl, CACHE_TTL)
+
+
+def cache_baselines(today: date, baselines: dict, version: int):
+    history_dates = get_same_weekday_dates(today)
+    for newspaper_id, baseline in baselines.items():
+        get_cache().set(
+            f"baseline:{newspaper_id}:{today}",
+            baseline,
+            get_baseline_ttl(),
+            article_tags(newspaper_id, history_dates),
+            version,
+        )
+
+
+def verify_newspaper(today: date, newspaper_id: int):
+    """Verifies today's article count of one newspaper. Only today's count
+    is queried when the newspaper's baseline is cached; baselines are
+    invalidated by article writes on their history days."""
+    service = get_news_article_service()
+
+    baseline = get_cache().get(f"baseline:{newspaper_id}:{today}")
+    if baseline is None:
+        version = get_cache().version()
+        history_dates = get_same_weekday_dates(today)
+        counts_by_day = service.get_counts_by_day(newspaper_id, history_dates + [today])
+
+        history = np.array([[counts_by_day.get(day, 0) for day in history_dates]])
+        baseline = compute_baselines([newspaper_id], history)[newspaper_id]
+        cache_baselines(today, {newspaper_id: baseline}, version)
+        today_count = counts_by_day.get(today, 0)
+    else:
+        today_count = service.get_counts_by_day(newspaper_id, [today]).get(today, 0)
+
+    return make_verdict(newspaper_id, today_count, baseline)
+
+
+def verify_newspapers(today: date, newspaper_ids: Optional[List[int]] = None):
+    """Verifies today's article count of every newspaper (or the given ones)
+    with a single query, returning one verdict dict per newspaper."""
+    return list(iter_verdicts(today, *get_verification_counts(today, newspaper_ids)))
+
+
+def get_verification_counts(today: date, newspaper_ids: Optional[List[int]] = None):
+    """(newspaper_id, day, count) rows of today and the history days of every
+    newspaper (or the given ones), ordered by newspaper, from a single query.
+    Returns them with the cache version taken before the query."""
+    version = get_cache().version()
+    rows = get_news_article_service().get_counts_by_newspaper(
+        get_same_weekday_dates(today) + [today], newspaper_ids
+    )
+    return rows, version
+
+
+def iter_verdicts(today: date, rows, version: int, chunk_size: int = VERIFY_CHUNK_SIZE):
+    """Yields the verdict of each newspaper of the rows. The verdicts are
+    computed for `chunk_size` newspapers at a time, so the first ones can be
+    sent before the last ones are computed."""
+    newspapers = groupby(rows, key=itemgetter(0))
+    while chunk := [(newspaper_id, list(group)) for newspaper_id, group in islice(newspapers, chunk_size)]:
+        yield from verify_chunk(today, chunk, version)
+
+
+def verify_chunk(today: date, chunk, version: int):
+    history_dates = get_same_weekday_dates(today)
+    columns = {day: index for index, day in enumerate(history_dates)}
+    ids = [newspaper_id for newspaper_id, _ in chunk]
+
+    # Newspapers x same weekday dates, days without articles count as 0
+    history = np.zeros((len(ids), len(history_dates)), dtype=int)
+    today_counts = np.zeros(len(ids), dtype=int)
+
+    for row, (_, group) in enumerate(chunk):
+        for _, day, count in group:
+            if not count:
+                continue
+            if day == today:
+                today_counts[row] = count
+            else:
+                history[row, columns[day]] = count
+
+    baselines = compute_baselines(ids, history)
+    cache_baselines(today, baselines, version)
+
+    for newspaper_id, today_count in zip(ids, today_counts):
+        yield make_verdict(newspaper_id, int(today_count), baselines[newspaper_id])
+
+
+def run_verification(today: date):
+    """Verifies every newspaper and stores the verdicts. Returns those to
+    alert about."""
+    verdicts = verify_newspapers(today)
+    VerificationRepository().save_many(today, verdicts)
+    return [verdict for verdict in verdicts if verdict["status"] in ALERT_STATUSES]
+
+
+def compute_baselines(ids: List[int], history: np.ndarray):
+    """Statistics of each row of `history` (one daily series per newspaper),
+    computed for all rows in one pass."""
+    days = history.shape[1]
+    totals = history.sum(axis=1)
+
+    average = history.mean(axis=1)
+    std_dev = history.std(axis=1, ddof=1) if days > 1 else np.zeros(len(ids))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(average > 0, std_dev / average, 0)
+
+    ordered = np.sort(history, axis=1)
+    q1 = ordered[:, days // 4]
+    q3 = ordered[:, (days * 3) // 4]
+
+    # Most frequent count, the smallest one on ties
+    frequencies = (ordered[:, :, None] == ordered[:, None, :]).sum(axis=2)
+    most_frequent = ordered[np.arange(len(ids)), np.argmax(frequencies, axis=1)]
+
+    return {
+        newspaper_id: {
+            "has_data": bool(totals[i] > 0),
+            "average": float(average[i]),
+            "threshold": float(average[i] * THRESHOLD_RATIO),
+            "std_dev": float(std_dev[i]),
+            "cv": float(cv[i]),
+            "q1": int(q1[i]),
+            "q3": int(q3[i]),
+            "most_frequent_count": int(most_frequent[i]),
+        }
+        for i, newspaper_id in enumerate(ids)
+    }
+
+
+def make_verdict(newspaper_id: int, today_count: int, baseline: dict):
+    """Phase 1 compares today's count with 80% of the average. Below it, the
+    coefficient of variation decides between checking the first quartile
+    (high variability) or the most frequent count (low variability)."""
+    verdict = {"newspaper_id": newspaper_id, "today_count": today_count}
+
+    if not baseline["has_data"]:
+        verdict.update(status="no_data", message="No data found for this newspaper")
+        return verdict
+
+    verdict.update({key: value for key, value in baseline.items() if key != "has_data"})
+    verdict.update(get_verdict(today_count, baseline))
+    return verdict
+
+
+def get_verdict(today_count: int, stats: dict):
+    if today_count >= stats["threshold"]:
+        return {
+            "status": "above_threshold",
+            "message": f"Today's article count ({today_count}) is above the 80% threshold ({stats['threshold']:.2f}).",
+        }
+
+    if stats["cv"] > HIGH_CV:
+        if today_count < stats["q1"]:
+            return {
+                "status": "below_q1",
+                "message": f"Today's article count is below the first quartile (Q1={stats['q1']}).",
+            }
+        return {
+            "status": "within_iqr",
+            "message": f"Today's article count is within acceptable interquartile range (IQR={stats['q3'] - stats['q1']}).",
+        }
+
+    most_frequent_count = stats["most_frequent_count"]
+    if today_count == most_frequent_count:
+        return {
+            "status": "matches_most_frequent",
+            "message": f"Today's article count matches the most frequent count ({most_frequent_count}).",
+        }
+    return {
+        "status": "differs_from_most_frequent",
+        "message": f"Today's article count ({today_count}) does not match the most frequent count ({most_frequent_count}).",
+    }
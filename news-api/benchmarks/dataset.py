@@ -0,0 +1,89 @@
+import random
+import time
+from datetime import date, timedelta
+
+from app.db import get_db
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+from app.migrations import run_migrations
+from app.rollup import rebuild_daily_article_counts
+from app.services.article_content_repository import ArticleContentRepository
+from app.services.article_search_repository import ArticleSearchRepository
+from app.services.base_repository import BaseRepository
+from app.services.seed_service import batched
+
+# Synthetic text is built from a small vocabulary, Faker is far too slow for
+# millions of articles
+WORDS = (
+    "news report government market city team season police health school "
+    "court weather company price election minister water energy road music "
+    "festival science study hospital workers union bank trade law project"
+).split()
+
+HISTORY_DAYS = 183
+
+
+def generate_articles(articles_count: int, newspapers_count: int, content_words: int, seed: int):
+    """Yields (newspaper_id, title, content, date_uploaded) tuples."""
+    rng = random.Random(seed)
+    today = date.today()
+    for _ in range(articles_count):
+        yield (
+            rng.randint(1, newspapers_count),
+            " ".join(rng.choices(WORDS, k=8)).capitalize(),
+            " ".join(rng.choices(WORDS, k=content_words)),
+            today - timedelta(days=rng.randint(0, HISTORY_DAYS)),
+        )
+
+
+def seed_dataset(
+    articles_count: int,
+    newspapers_count: int,
+    content_words: int = 400,
+    batch_size: int = 5000,
+    seed: int = 42,
+):
+    """Fills an empty database with a reproducible synthetic dataset.
+
+    Rows are inserted straight into the articles, contents and search
+    tables and the daily counts are rebuilt once at the end, which is much
+    faster than going through NewsArticleService for millions of rows.
+    """
+    run_migrations()
+    db = get_db()
+    start = time.perf_counter()
+
+    with db.connection_context():
+        if NewsArticleEntity.select().exists():
+            print("Database already seeded, reusing it")
+            return
+
+        with db.atomic():
+            NewspaperEntity.insert_many(
+                [(f"Newspaper {i}", f"newspaper{i}@example.com") for i in range(1, newspapers_count + 1)],
+                fields=[NewspaperEntity.name, NewspaperEntity.email],
+            ).execute()
+
+        articles_repository = BaseRepository(NewsArticleEntity)
+        contents = ArticleContentRepository()
+        search_index = ArticleSearchRepository()
+        inserted = 0
+        articles = generate_articles(articles_count, newspapers_count, content_words, seed)
+        for batch in batched(articles, batch_size):
+            with db.atomic():
+                ids = articles_repository.create_many(
+                    [
+                        {"newspaper_id": newspaper_id, "title": title, "date_uploaded": day}
+                        for newspaper_id, title, _, day in batch
+                    ]
+                )
+                contents.save_many({id: row[2] for id, row in zip(ids, batch)})
+                search_index.index_many(
+                    {"id": id, "title": row[1], "content": row[2]} for id, row in zip(ids, batch)
+                )
+            inserted += len(batch)
+            if inserted % (batch_size * 20) == 0 or inserted == articles_count:
+                print(f"{inserted}/{articles_count} articles ({time.perf_counter() - start:.0f}s)")
+
+    rebuild_daily_article_counts()
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,182 @@
+"""Benchmarks the hot endpoints of the API against a local SQLite dataset.
+
+    python -m benchmarks.run --articles 10000
+    python -m benchmarks.run --articles 1000000 --concurrency 32 --compare benchmarks/results/previous.json
+
+The database file is kept and reused by later runs with the same scale.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the News API hot paths")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="Dataset size")
+    parser.add_argument("--articles", type=int, help="Number of articles, overrides --scale")
+    parser.add_argument("--articles-per-newspaper", type=int, default=1000)
+    parser.add_argument("--content-words", type=int, default=400, help="Words per article body")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--data-dir", default="benchmarks/data")
+    parser.add_argument("--output", help="Results file, benchmarks/results/<timestamp>.json by default")
+    parser.add_argument("--compare", help="Previous results file to compare with")
+    parser.add_argument("--only", nargs="*", help="Names of the endpoints to run")
+    return parser.parse_args()
+
+
+def get_endpoints(newspapers_count: int, requests: int):
+    """URLs requested for each endpoint, spread over random newspapers."""
+    rng = random.Random(0)
+    ids = [rng.randint(1, newspapers_count) for _ in range(requests)]
+
+    return {
+        "news_articles": ["/news-articles"],
+        "news_articles_projected": ["/news-articles?fields=id,title,date_uploaded"],
+        "verify_articles": [f"/reports/verify-articles/{id}" for id in ids],
+        "report_articles_by_day": [f"/reports/report-articles-by-day/{id}" for id in ids],
+        "test_central_tendency": [f"/tests/test/central-tendency?newspaper_id={id}" for id in ids],
+        "test_dispersion": [f"/tests/test/dispersion?newspaper_id={id}" for id in ids],
+        "test_regression": [f"/tests/test/regression?newspaper_id={id}" for id in ids],
+        "test_canonical": [f"/tests/test/canonical?newspaper_id={id}" for id in ids],
+    }
+
+
+async def measure(client, urls, requests: int, concurrency: int):
+    import numpy as np
+
+    latencies = []
+    statuses = Counter()
+    counter = itertools.count()
+
+    async def worker():
+        while (index := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await client.get(urls[index % len(urls)])
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    # Warm up caches and connections
+    await client.get(urls[0])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": requests / elapsed,
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+async def run_benchmarks(args, newspapers_count: int):
+    import httpx
+
+    from app.main import app
+
+    endpoints = get_endpoints(newspapers_count, args.requests)
+    results = {}
+
+    # Server errors are counted, not raised
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, urls in endpoints.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = await measure(client, urls, args.requests, args.concurrency)
+            print_result(name, results[name])
+
+    return results
+
+
+def print_result(name: str, result: dict, previous: dict = None):
+    line = (
+        f"{name:<26} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+        f"errors {result['errors']}"
+    )
+    if previous:
+        change = (result["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"] * 100
+        line += f"  p50 {change:+.1f}% vs previous"
+    print(line)
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    articles_count = args.articles or SCALES[args.scale]
+    newspapers_count = max(1, articles_count // args.articles_per_newspaper)
+
+    # The app reads its settings when imported
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.environ["DB_ENGINE"] = "sqlite"
+    os.environ["DB_NAME"] = os.path.join(
+        args.data_dir, f"benchmark_{articles_count}_{args.content_words}.db"
+    )
+    if args.no_cache:
+        os.environ["CACHE_ENABLED"] = "0"
+
+    from benchmarks.dataset import seed_dataset
+
+    seed_dataset(articles_count, newspapers_count, args.content_words)
+
+    print(f"Benchmarking {articles_count} articles, {newspapers_count} newspapers")
+    results = asyncio.run(run_benchmarks(args, newspapers_count))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "articles": articles_count,
+            "newspapers": newspapers_count,
+            "content_words": args.content_words,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": not args.no_cache,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)["results"]
+        print("\nCompared with", args.compare)
+        for name, result in results.items():
+            print_result(name, result, previous.get(name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compares the two ways of encoding a page of articles in the list endpoints.
+
+    python -m benchmarks.serialization --articles 100000
+
+"validated" is what FastAPI does with a response_model: every row is
+validated into a NewsArticle, dumped back to JSON-compatible data and
+encoded with json.dumps. "direct" encodes the database rows as they are.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List
+
+os.environ.setdefault("DB_ENGINE", "sqlite")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the list serialization")
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows encoded per response")
+    parser.add_argument("--content-words", type=int, default=400, help="Words per article body")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each path, the best one is kept")
+    return parser.parse_args()
+
+
+def make_rows(articles_count: int, content_words: int):
+    """Rows shaped like BaseRepository.get_page output."""
+    from benchmarks.dataset import generate_articles
+
+    articles = generate_articles(articles_count, 100, content_words, seed=42)
+    return [
+        {"id": id, "newspaper_id": newspaper_id, "title": title, "content": content, "date_uploaded": day}
+        for id, (newspaper_id, title, content, day) in enumerate(articles, start=1)
+    ]
+
+
+def validated_path():
+    from pydantic import TypeAdapter
+
+    from app.models.news_article import NewsArticle
+
+    adapter = TypeAdapter(List[NewsArticle])
+
+    def encode(rows):
+        content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+        # As rendered by JSONResponse
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    return encode
+
+
+def direct_path():
+    from app.controllers.base_controller import encode_rows
+
+    return encode_rows
+
+
+def measure(encode, pages, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(encode(page)) for page in pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    args = parse_args()
+    rows = make_rows(args.articles, args.content_words)
+    pages = [rows[i : i + args.page_size] for i in range(0, len(rows), args.page_size)]
+
+    results = {}
+    for name, encode in (("validated", validated_path()), ("direct", direct_path())):
+        seconds, size = measure(encode, pages, args.repeat)
+        results[name] = seconds
+        print(
+            f"{name:10} {seconds * 1000:9.1f} ms  {args.articles / seconds:12,.0f} rows/s"
+            f"  {seconds / len(pages) * 1000:7.2f} ms/page  {size / 1e6:8.1f} MB"
+        )
+
+    print(f"direct is {results['validated'] / results['direct']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
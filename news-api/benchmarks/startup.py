@@ -0,0 +1,88 @@
+"""Measures the startup time and memory of an API worker.
+
+    python -m benchmarks.startup --runs 5 --workers 8
+
+Each scenario imports the app in a fresh interpreter, as every worker
+process of a multi-worker deployment does.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Code run by the worker interpreter: imports, then reports time and peak RSS
+WORKER = """
+import json, resource, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+heavy = [name for name in ("numpy", "scipy", "sklearn") if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_mb, "heavy_modules": heavy}}))
+"""
+
+SCENARIOS = {
+    # What every worker paid when test_controller imported scikit-learn
+    "eager_stats": ["import sklearn.linear_model, sklearn.discriminant_analysis", "import app.main"],
+    "lazy_stats": ["import app.main"],
+    "tests_routes_disabled": ["import app.main"],
+}
+
+# Modules a scenario needs besides the app's requirements
+SCENARIO_REQUIREMENTS = {"eager_stats": "sklearn"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measures the API worker startup")
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters started per scenario")
+    parser.add_argument("--workers", type=int, default=8, help="Workers of the deployment to size")
+    return parser.parse_args()
+
+
+def run_worker(imports, env):
+    code = WORKER.format(imports="\n".join(imports))
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            DB_ENGINE="sqlite",
+            DB_NAME=os.path.join(directory, "startup.db"),
+        )
+
+        for name, imports in SCENARIOS.items():
+            requirement = SCENARIO_REQUIREMENTS.get(name)
+            if requirement and importlib.util.find_spec(requirement) is None:
+                print(f"{name:24} skipped, {requirement} is not installed")
+                continue
+
+            scenario_env = dict(env, TESTS_ROUTES_ENABLED="0" if name == "tests_routes_disabled" else "1")
+            runs = [run_worker(imports, scenario_env) for _ in range(args.runs)]
+
+            seconds = statistics.median(run["seconds"] for run in runs)
+            rss_mb = statistics.median(run["rss_mb"] for run in runs)
+            print(
+                f"{name:24} {seconds * 1000:8.0f} ms {rss_mb:8.1f} MB"
+                f"   {args.workers} workers: {rss_mb * args.workers:8.1f} MB"
+                f"   loaded: {', '.join(runs[0]['heavy_modules']) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Compares the articles table before and after the 0005_article_contents
+migration, which moves the bodies to news_article_contents, compressed.
+
+    python -m benchmarks.storage --articles 100000
+
+A SQLite database is filled with the previous layout (content inline in
+news_articles), measured, migrated in place and measured again.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ["DB_ENGINE"] = "sqlite"
+
+LEGACY_TABLE = """
+CREATE TABLE news_articles (
+    id INTEGER NOT NULL PRIMARY KEY,
+    newspaper_id INTEGER NOT NULL REFERENCES newspapers (id) ON DELETE CASCADE,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    date_uploaded DATE NOT NULL
+)
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the article storage layout")
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--newspapers", type=int, default=100)
+    parser.add_argument("--content-words", type=int, default=400, help="Words per article body")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each query, the best one is kept")
+    return parser.parse_args()
+
+
+def create_legacy_database(args):
+    """Migrated schema, with news_articles rebuilt as it was before 0005."""
+    from peewee import Table
+
+    from app.db import get_db
+    from app.entities.migration_entity import MigrationEntity
+    from app.entities.newspaper_entity import NewspaperEntity
+    from app.migrations import run_migrations
+    from app.rollup import rebuild_daily_article_counts
+    from app.services.seed_service import batched
+    from benchmarks.dataset import generate_articles
+
+    run_migrations()
+    db = get_db()
+    with db.connection_context():
+        for statement in (
+            "DROP TABLE news_article_contents",
+            "DROP TABLE news_articles_search",
+            "DROP TABLE news_articles",
+            LEGACY_TABLE,
+            "CREATE INDEX news_articles_newspaper_id_date_uploaded ON news_articles (newspaper_id, date_uploaded)",
+        ):
+            db.execute_sql(statement)
+        MigrationEntity.delete().where(MigrationEntity.name == "0005_article_contents").execute()
+
+        NewspaperEntity.insert_many(
+            [(f"Newspaper {i}", f"newspaper{i}@example.com") for i in range(1, args.newspapers + 1)],
+            fields=[NewspaperEntity.name, NewspaperEntity.email],
+        ).execute()
+        articles = Table("news_articles", ("newspaper_id", "title", "content", "date_uploaded")).bind(db)
+        rows = generate_articles(args.articles, args.newspapers, args.content_words, seed=42)
+        for batch in batched(rows, 5000):
+            with db.atomic():
+                articles.insert(batch).execute()
+
+    rebuild_daily_article_counts()
+
+
+def get_sizes():
+    from app.db import get_db
+
+    db = get_db()
+    with db.connection_context():
+        sizes = dict(db.execute_sql("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    return {
+        "news_articles": sizes.get("news_articles", 0),
+        "news_article_contents": sizes.get("news_article_contents", 0),
+        "database": sum(sizes.values()),
+    }
+
+
+def get_queries():
+    """Report-like queries over the articles table, none of them reads the
+    content."""
+    from peewee import fn
+
+    from app.entities.news_article_entity import NewsArticleEntity as Article
+    from app.services.daily_article_count_repository import DailyArticleCountRepository
+    from app.services.news_article_service import get_news_article_service
+
+    service = get_news_article_service()
+
+    def list_all():
+        # Every page of GET /news-articles?limit=1000
+        after_id = None
+        while True:
+            rows = service.get_all(after_id, 1000)
+            if len(rows) < 1000:
+                return
+            after_id = rows[-1]["id"]
+
+    def titles_by_month():
+        # Not covered by an index, every row is read
+        month = fn.strftime("%Y-%m", Article.date_uploaded)
+        query = (
+            Article.select(month, fn.COUNT(Article.id))
+            .where(Article.title.startswith("News"))
+            .group_by(month)
+        )
+        return list(query.tuples())
+
+    return {
+        "list_all_pages": list_all,
+        "titles_by_month": titles_by_month,
+        "rebuild_daily_counts": DailyArticleCountRepository().rebuild,
+    }
+
+
+def measure(repeat: int):
+    from app.db import get_db
+
+    db = get_db()
+    results = {}
+    with db.connection_context():
+        for name, query in get_queries().items():
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with db.atomic():
+                    query()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+    return results
+
+
+def migrate():
+    from app.db import get_db
+    from app.migrations import run_migrations
+
+    start = time.perf_counter()
+    run_migrations()
+    elapsed = time.perf_counter() - start
+
+    # The freed pages stay in the file until it is rebuilt
+    db = get_db()
+    with db.connection_context():
+        db.execute_sql("VACUUM")
+    return elapsed
+
+
+def print_sizes(name: str, sizes: dict):
+    print(
+        f"{name:8} news_articles {sizes['news_articles'] / 1e6:8.1f} MB"
+        f"   news_article_contents {sizes['news_article_contents'] / 1e6:8.1f} MB"
+        f"   database {sizes['database'] / 1e6:8.1f} MB"
+    )
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The app reads its settings when imported
+        os.environ["DB_NAME"] = os.path.join(directory, "storage.db")
+        create_legacy_database(args)
+
+        before_sizes, before = get_sizes(), measure(args.repeat)
+        print(f"Migrated {args.articles} articles in {migrate():.1f}s")
+        after_sizes, after = get_sizes(), measure(args.repeat)
+
+    print_sizes("before", before_sizes)
+    print_sizes("after", after_sizes)
+    for name in before:
+        print(
+            f"{name:22} before {before[name] * 1000:9.1f} ms   after {after[name] * 1000:9.1f} ms"
+            f"   {before[name] / after[name]:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
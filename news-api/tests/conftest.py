@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+# The settings are read when the app is imported: the tests run against two
+# SQLite shards, so the routing is exercised by every test
+DATABASE_DIR = tempfile.mkdtemp(prefix="news-api-tests-")
+os.environ.update(
+    DB_ENGINE="sqlite",
+    DB_SHARDS=",".join(os.path.join(DATABASE_DIR, f"shard{index}.db") for index in range(2)),
+    DB_REPLICAS="",
+    CACHE_ENABLED="1",
+    TESTS_ROUTES_ENABLED="1",
+    TESTS_EXPORT_DIR="",
+    VERIFY_AT="",
+    NOTIFY_SMTP_HOST="",
+    NOTIFY_WEBHOOK_URL="",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.cache import get_cache  # noqa: E402
+from app.db import get_db, get_shard_map, scatter  # noqa: E402
+from app.entities.daily_article_count_entity import DailyArticleCountEntity  # noqa: E402
+from app.entities.newspaper_entity import NewspaperEntity  # noqa: E402
+from app.entities.verification_entity import VerificationEntity  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.article_search_repository import SEARCH_TABLE  # noqa: E402
+from app.services.regression_service import get_regression_registry  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Starting the app runs the migrations on every shard
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def clean_database(client):
+    yield
+
+    def clean():
+        # Articles, their contents and daily counts go with their newspaper
+        NewspaperEntity.delete().execute()
+        DailyArticleCountEntity.delete().execute()
+        VerificationEntity.delete().execute()
+        get_db().execute_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')")
+
+    with get_db().connection_context():
+        scatter(clean)
+    get_cache().clear()
+    get_regression_registry().models.clear()
+
+
+@pytest.fixture
+def newspapers(client):
+    """Ids of two newspapers of each shard."""
+    ids = {shard: [] for shard in range(get_shard_map().count)}
+    while any(len(shard_ids) < 2 for shard_ids in ids.values()):
+        newspaper = client.post("/newspapers", json={"name": "Daily", "email": "daily@example.com"}).json()
+        shard_ids = ids[get_shard_map().shard_for(newspaper["id"])]
+        if len(shard_ids) < 2:
+            shard_ids.append(newspaper["id"])
+    return ids
+
+
+@pytest.fixture
+def create_article(client):
+    """Creates an article through the API and returns it."""
+
+    def create(newspaper_id, day=None, title="Title", content="Some content"):
+        article = {"newspaper_id": newspaper_id, "title": title, "content": content}
+        if day is not None:
+            article["date_uploaded"] = str(day)
+        response = client.post("/news-articles", json=article)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
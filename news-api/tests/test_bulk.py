@@ -0,0 +1,79 @@
+import json
+
+
+def test_bulk_create_reports_each_rejected_item(client, newspapers):
+    items = [
+        {"newspaper_id": newspapers[0][0], "title": "Kept", "content": "a"},
+        {"newspaper_id": newspapers[0][0], "title": "No content"},
+        {"newspaper_id": 999_999, "title": "Unknown newspaper", "content": "b"},
+        {"newspaper_id": newspapers[1][0], "title": "Kept too", "content": "c", "unknown": 1},
+        {"newspaper_id": newspapers[1][0], "title": "Kept too", "content": "c"},
+    ]
+
+    result = client.post("/news-articles/bulk", json=items).json()
+
+    assert result["succeeded"] == 2
+    assert [error["index"] for error in result["errors"]] == [1, 3, 2]
+    assert result["errors"][0]["detail"] == "Missing field 'content'"
+    assert result["errors"][1]["detail"] == "Unknown fields: unknown"
+    titles = sorted(row["title"] for row in client.get("/news-articles").json())
+    assert titles == ["Kept", "Kept too"]
+
+
+def test_bulk_update_reports_missing_and_duplicate_ids(client, newspapers, create_article):
+    first = create_article(newspapers[0][0])
+    second = create_article(newspapers[1][0])
+
+    result = client.patch(
+        "/news-articles/bulk",
+        json=[
+            {"id": first["id"], "title": "Renamed"},
+            {"id": 999_999, "title": "Missing"},
+            {"title": "No id"},
+            {"id": first["id"], "title": "Twice"},
+            {"id": second["id"], "content": "New body"},
+        ],
+    ).json()
+
+    assert result["succeeded"] == 2
+    assert [(error["index"], error["detail"]) for error in result["errors"]] == [
+        (1, "Not found"),
+        (2, "Missing id"),
+        (3, "Duplicate id"),
+    ]
+    assert client.get(f"/news-articles/{first['id']}").json()["title"] == "Renamed"
+    assert client.get(f"/news-articles/{second['id']}").json()["content"] == "New body"
+
+
+def test_bulk_delete_reports_missing_ids(client, newspapers, create_article):
+    ids = [create_article(newspaper_id)["id"] for newspaper_id in (newspapers[0][0], newspapers[1][0])]
+
+    result = client.request("DELETE", "/news-articles/bulk", json=ids + [999_999]).json()
+
+    assert result == {"succeeded": 2, "errors": [{"index": 2, "id": 999_999, "detail": "Not found"}]}
+    assert client.get("/news-articles").json() == []
+
+
+def test_ingest_reports_the_rejected_lines(client, newspapers):
+    lines = [
+        json.dumps({"newspaper_id": newspapers[0][0], "title": "One", "content": "x"}),
+        "not json",
+        "",
+        json.dumps({"newspaper_id": newspapers[1][0], "title": "Two"}),
+        json.dumps({"newspaper_id": 999_999, "title": "Three", "content": "x"}),
+        json.dumps({"newspaper_id": newspapers[1][0], "title": "Four", "content": "x"}),
+    ]
+
+    response = client.post(
+        "/news-articles/ingest",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    result = response.json()
+    assert result["accepted"] == 2
+    assert result["rejected"] == 3
+    assert [error["line"] for error in result["errors"]] == [2, 4, 5]
+    assert result["errors"][1]["detail"].startswith("content:")
+    titles = sorted(row["title"] for row in client.get("/news-articles").json())
+    assert titles == ["Four", "One"]
@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+
+from app.cache import TTLCache, article_tags, get_cache
+
+
+def last_week_monday():
+    today = date.today()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def test_reports_are_served_from_the_cache(client, newspapers):
+    newspaper_id = newspapers[0][0]
+    client.get(f"/reports/report-articles-by-day/{newspaper_id}")
+    hits = get_cache().stats()["hits"]
+
+    client.get(f"/reports/report-articles-by-day/{newspaper_id}")
+
+    assert get_cache().stats()["hits"] == hits + 1
+
+
+def test_backdated_article_invalidates_the_report(client, newspapers, create_article):
+    newspaper_id = newspapers[1][0]
+    report = client.get(f"/reports/report-articles-by-day/{newspaper_id}").json()
+    assert report[0]["article_count"] == 0
+
+    create_article(newspaper_id, last_week_monday())
+
+    report = client.get(f"/reports/report-articles-by-day/{newspaper_id}").json()
+    assert report[0] == {"date": str(last_week_monday()), "article_count": 1}
+
+
+def test_other_newspapers_keep_their_cached_report(client, newspapers, create_article):
+    first, second = newspapers[0]
+    client.get(f"/reports/report-articles-by-day/{first}")
+    client.get(f"/reports/report-articles-by-day/{second}")
+
+    create_article(first, last_week_monday())
+    hits = get_cache().stats()["hits"]
+    client.get(f"/reports/report-articles-by-day/{second}")
+
+    assert get_cache().stats()["hits"] == hits + 1
+
+
+def test_newspaper_statistics_follow_newspaper_writes(client, newspapers, create_article):
+    ids = sorted(newspapers[0] + newspapers[1])
+    assert client.get("/tests/newspapers").json()["newspaper_id"] == ids
+
+    created = client.post("/newspapers", json={"name": "Late", "email": "late@example.com"}).json()
+    create_article(created["id"], date.today() - timedelta(days=1))
+    statistics = client.get("/tests/newspapers").json()
+    assert statistics["newspaper_id"] == ids + [created["id"]]
+    assert statistics["total"][-1] == 1
+
+    client.delete(f"/newspapers/{ids[0]}")
+    assert client.get("/tests/newspapers").json()["newspaper_id"] == ids[1:] + [created["id"]]
+
+
+def test_batch_verification_follows_newspaper_writes(client, newspapers):
+    ids = sorted(newspapers[0] + newspapers[1])
+
+    def verified_ids():
+        lines = client.get("/reports/verify-articles").text.splitlines()
+        return [int(line.split('"newspaper_id":')[1].split(",")[0]) for line in lines]
+
+    assert verified_ids() == ids
+    client.delete(f"/newspapers/{ids[0]}")
+    assert verified_ids() == ids[1:]
+
+
+def test_values_computed_before_an_invalidation_are_not_stored():
+    cache = TTLCache()
+    tags = article_tags(1, [date(2026, 3, 2)])
+
+    version = cache.version()
+    cache.invalidate(tags)
+    cache.set("report", "stale", 60, tags, version)
+    assert cache.get("report") is None
+
+    cache.set("report", "fresh", 60, tags, cache.version())
+    assert cache.get("report") == "fresh"
+
+
+def test_invalidation_only_drops_the_entries_of_its_tags():
+    cache = TTLCache()
+    cache.set("monday", 1, 60, article_tags(1, [date(2026, 3, 2)]))
+    cache.set("tuesday", 2, 60, article_tags(1, [date(2026, 3, 3)]))
+
+    cache.invalidate(article_tags(1, [date(2026, 3, 2)]))
+
+    assert cache.get("monday") is None
+    assert cache.get("tuesday") == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_expired_entries_are_misses():
+    cache = TTLCache()
+    cache.set("gone", 1, -1)
+    assert cache.get("gone") is None
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from app.rollup import rebuild_daily_article_counts
+from app.services.daily_article_count_repository import DailyArticleCountRepository
+
+MONDAY = date(2026, 3, 2)
+TUESDAY = date(2026, 3, 3)
+
+
+@pytest.fixture
+def daily_counts():
+    return DailyArticleCountRepository()
+
+
+def test_creates_count_the_articles_per_day(client, newspapers, create_article, daily_counts):
+    newspaper_id = newspapers[0][0]
+    create_article(newspaper_id, MONDAY)
+    create_article(newspaper_id, MONDAY)
+    create_article(newspaper_id, TUESDAY)
+
+    assert daily_counts.get_daily_counts(newspaper_id) == [(MONDAY, 2), (TUESDAY, 1)]
+
+
+def test_updates_move_the_count_to_the_new_day_and_newspaper(client, newspapers, create_article, daily_counts):
+    first, second = newspapers[1]
+    article = create_article(first, MONDAY)
+
+    change = {"newspaper_id": second, "date_uploaded": str(TUESDAY)}
+    response = client.put(f"/news-articles/{article['id']}", json=change)
+    assert response.status_code == 200
+
+    assert daily_counts.get_daily_counts(first) == []
+    assert daily_counts.get_daily_counts(second) == [(TUESDAY, 1)]
+
+
+def test_bulk_updates_move_the_counts(client, newspapers, create_article, daily_counts):
+    newspaper_id = newspapers[0][0]
+    ids = [create_article(newspaper_id, MONDAY)["id"] for _ in range(3)]
+
+    client.patch("/news-articles/bulk", json=[{"id": id, "date_uploaded": str(TUESDAY)} for id in ids[:2]])
+
+    assert daily_counts.get_daily_counts(newspaper_id) == [(MONDAY, 1), (TUESDAY, 2)]
+
+
+def test_deletes_decrement_the_counts(client, newspapers, create_article, daily_counts):
+    newspaper_id = newspapers[1][0]
+    ids = [create_article(newspaper_id, MONDAY)["id"] for _ in range(3)]
+
+    client.delete(f"/news-articles/{ids[0]}")
+    client.request("DELETE", "/news-articles/bulk", json=ids[1:2])
+
+    assert daily_counts.get_daily_counts(newspaper_id) == [(MONDAY, 1)]
+
+
+def test_counts_match_a_rebuild(client, newspapers, create_article, daily_counts):
+    ids = [
+        create_article(newspaper_id, day)["id"]
+        for newspaper_id in newspapers[0] + newspapers[1]
+        for day in (MONDAY, TUESDAY)
+    ]
+    client.put(f"/news-articles/{ids[0]}", json={"date_uploaded": str(TUESDAY)})
+    client.delete(f"/news-articles/{ids[-1]}")
+
+    newspaper_ids = newspapers[0] + newspapers[1]
+    maintained = {id: daily_counts.get_daily_counts(id) for id in newspaper_ids}
+    rebuild_daily_article_counts()
+    assert {id: daily_counts.get_daily_counts(id) for id in newspaper_ids} == maintained
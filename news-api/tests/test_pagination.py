@@ -0,0 +1,52 @@
+def test_pages_follow_the_next_after_id_header(client, newspapers, create_article):
+    ids = [create_article(newspaper_id)["id"] for shard_ids in newspapers.values() for newspaper_id in shard_ids]
+
+    seen = []
+    params = {"limit": 3}
+    while True:
+        response = client.get("/news-articles", params=params)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        if "X-Next-After-Id" not in response.headers:
+            break
+        params["after_id"] = response.headers["X-Next-After-Id"]
+
+    # Merged from both shards, in id order, each article once
+    assert seen == sorted(ids)
+
+
+def test_last_full_page_has_a_cursor_to_an_empty_page(client, newspapers, create_article):
+    newspaper_id = newspapers[0][0]
+    ids = [create_article(newspaper_id)["id"] for _ in range(2)]
+
+    response = client.get("/news-articles", params={"limit": 2})
+    assert response.headers["X-Next-After-Id"] == str(ids[-1])
+
+    response = client.get("/news-articles", params={"limit": 2, "after_id": ids[-1]})
+    assert response.json() == []
+    assert "X-Next-After-Id" not in response.headers
+
+
+def test_fields_selects_the_returned_fields(client, newspapers, create_article):
+    article = create_article(newspapers[1][0], title="Projected", content="Body")
+
+    rows = client.get("/news-articles", params={"fields": "title,newspaper_id"}).json()
+    assert rows == [{"id": article["id"], "title": "Projected", "newspaper_id": newspapers[1][0]}]
+
+    # The content is only loaded when asked for
+    assert "content" not in client.get("/news-articles").json()[0]
+    rows = client.get("/news-articles", params={"fields": "content"}).json()
+    assert rows == [{"id": article["id"], "content": "Body"}]
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/news-articles", params={"fields": "title,secret"})
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+
+
+def test_ndjson_stream_returns_every_row(client, newspapers, create_article):
+    ids = [create_article(newspaper_id)["id"] for newspaper_id in newspapers[0] + newspapers[1]]
+
+    response = client.get("/news-articles", params={"stream": "ndjson", "fields": "id"})
+    assert response.text.splitlines() == [f'{{"id":{id}}}' for id in sorted(ids)]
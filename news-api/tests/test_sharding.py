@@ -0,0 +1,85 @@
+import pytest
+from peewee import IntegrityError
+
+from app.db import ShardMap, get_shard_map, scatter
+from app.entities.news_article_entity import NewsArticleEntity
+from app.entities.newspaper_entity import NewspaperEntity
+from app.services.news_article_service import get_news_article_service
+
+
+def test_hash_strategy_is_stable_and_spreads_newspapers():
+    shard_map = ShardMap(2)
+    shards = [shard_map.shard_for(newspaper_id) for newspaper_id in range(1, 101)]
+    assert shards == [shard_map.shard_for(newspaper_id) for newspaper_id in range(1, 101)]
+    assert 30 < shards.count(0) < 70
+
+
+def test_range_strategy_follows_bounds():
+    shard_map = ShardMap(3, "range", [10, 20])
+    assert [shard_map.shard_for(id) for id in (1, 9, 10, 19, 20, 1000)] == [0, 0, 1, 1, 2, 2]
+
+
+def test_range_strategy_needs_increasing_bounds():
+    with pytest.raises(ValueError):
+        ShardMap(3, "range", [20, 10])
+    with pytest.raises(ValueError):
+        ShardMap(3, "range", [10])
+
+
+def test_ids_are_interleaved_between_shards():
+    shard_map = ShardMap(3)
+    assert [shard_map.shard_of_id(id) for id in range(1, 7)] == [0, 1, 2, 0, 1, 2]
+
+
+def test_newspapers_are_replicated_to_every_shard(newspapers):
+    ids = sorted(newspapers[0] + newspapers[1])
+
+    def stored_ids():
+        return sorted(newspaper.id for newspaper in NewspaperEntity.select(NewspaperEntity.id))
+
+    assert scatter(stored_ids) == [ids, ids]
+
+
+def test_articles_are_stored_on_their_newspaper_shard(client, newspapers, create_article):
+    articles = [create_article(newspapers[shard][0]) for shard in (0, 1, 0, 1, 1)]
+
+    def stored_ids():
+        return {article.id for article in NewsArticleEntity.select(NewsArticleEntity.id)}
+
+    stored = scatter(stored_ids)
+    for article in articles:
+        shard = get_shard_map().shard_for(article["newspaper_id"])
+        assert article["id"] in stored[shard]
+        assert get_shard_map().shard_of_id(article["id"]) == shard
+        assert client.get(f"/news-articles/{article['id']}").json()["newspaper_id"] == article["newspaper_id"]
+
+
+def test_ids_stay_unique_across_shards(newspapers, create_article):
+    ids = [create_article(newspapers[shard][0])["id"] for shard in (0, 0, 1, 0, 1, 1)]
+    assert len(set(ids)) == len(ids)
+
+
+def test_bulk_created_articles_are_routed_by_newspaper(client, newspapers):
+    articles = [
+        {"newspaper_id": newspapers[shard][0], "title": "Title", "content": "Some content"}
+        for shard in (1, 0, 1, 0)
+    ]
+    assert client.post("/news-articles/bulk", json=articles).json()["succeeded"] == 4
+
+    def stored_articles():
+        return [(article.id, article.newspaper_id) for article in NewsArticleEntity.select()]
+
+    for shard, stored in enumerate(scatter(stored_articles)):
+        assert len(stored) == 2
+        for id, newspaper_id in stored:
+            assert get_shard_map().shard_of_id(id) == shard
+            assert get_shard_map().shard_for(newspaper_id) == shard
+
+
+def test_articles_cannot_move_to_another_shard(client, newspapers, create_article):
+    article = create_article(newspapers[0][0])
+
+    with pytest.raises(IntegrityError):
+        get_news_article_service().update({"id": article["id"], "newspaper_id": newspapers[1][0]})
+
+    assert client.get(f"/news-articles/{article['id']}").json()["newspaper_id"] == newspapers[0][0]
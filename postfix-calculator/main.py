@@ -1,3 +1,172 @@
+import argparse
+import mmap
+import operator
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "^": operator.pow,
+}
+
+# Instruction opcodes of a compiled program
+PUSH, LOAD, APPLY = range(3)
+
+# Below this many expressions, evaluate_many doesn't start worker processes
+PARALLEL_THRESHOLD = 10_000
+
+# Compiled programs kept for repeated expressions
+PROGRAM_CACHE_SIZE = 4096
+
+# Files larger than this are memory-mapped instead of read through a buffer
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Results written to the output at a time
+OUTPUT_BATCH_SIZE = 4096
+
+
+class PostfixProgram:
+    """
+    A postfix expression parsed once, ready to be evaluated many times.
+    Attributes:
+        expression (str): The source expression.
+        instructions (tuple): (opcode, argument) pairs: numbers to push, variables to load
+                              and operator functions to apply.
+        variables (tuple): Names of the variables used by the expression, in order of appearance.
+        max_depth (int): Maximum stack depth reached while evaluating.
+    """
+
+    def __init__(self, expression: str, instructions: tuple, variables: tuple, max_depth: int):
+        self.expression = expression
+        self.instructions = instructions
+        self.variables = variables
+        self.max_depth = max_depth
+
+    def evaluate(self, variables: dict = None):
+        """
+        Evaluates the program.
+        Args:
+            variables (dict): Values of the variables used by the expression. Values can be floats
+                              or NumPy arrays, which are evaluated element-wise.
+        Returns:
+            float: The result of the expression (an array if any variable is an array).
+        Raises:
+            ValueError: If a variable has no value.
+            ZeroDivisionError: If a division by zero happens with scalar values.
+        Example:
+            >>> compile_postfix("x 2 *").evaluate({"x": 4})
+            8.0
+        """
+        variables = variables or {}
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise ValueError(f"Missing value for variable '{missing[0]}'")
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        for opcode, argument in self.instructions:
+            if opcode == PUSH:
+                push(argument)
+            elif opcode == LOAD:
+                push(variables[argument])
+            else:
+                b = pop()
+                push(argument(pop(), b))
+
+        return pop()
+
+    def evaluate_batch(self, columns: dict):
+        """
+        Evaluates the program over columns of values, one row at a time but vectorized with NumPy.
+        Args:
+            columns (dict): Values of each variable, as sequences or NumPy arrays of the same length.
+        Returns:
+            numpy.ndarray: The result of each row. Rows dividing by zero give inf or nan.
+        Raises:
+            ValueError: If a variable has no column, or the columns have different lengths.
+        Example:
+            >>> compile_postfix("a b +").evaluate_batch({"a": [1, 2], "b": [3, 4]}).tolist()
+            [4.0, 6.0]
+        """
+        import numpy as np
+
+        arrays = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        lengths = {len(array) for array in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("All the columns must have the same length")
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = np.asarray(self.evaluate(arrays), dtype=float)
+
+        # Expressions without variables give a single value for every row
+        return np.broadcast_to(result, (lengths.pop() if lengths else 1,)).copy()
+
+
+def compile_postfix(expression: str) -> PostfixProgram:
+    """
+    Parses a postfix expression into a program that can be evaluated many times.
+    Args:
+        expression (str): A string containing a postfix expression where tokens are separated by spaces.
+                          Tokens can be numbers, variable names or operators (+, -, *, /, ^).
+    Returns:
+        PostfixProgram: The compiled expression.
+    Raises:
+        IndexError: If the expression is invalid and there are not enough operands for an operator.
+        ValueError: If a token is neither a number, a variable name nor an operator, or if operands
+                    are left without an operator.
+    Example:
+        >>> compile_postfix("13 15 2 * 1 51 - 3 2 ^ ^ / +").max_depth
+        5
+    """
+
+    instructions = []
+    variables = []
+    depth = max_depth = 0
+
+    for token in expression.split():
+        if token in OPERATORS:
+            if depth < 2:
+                raise IndexError(f"Not enough operands for operator '{token}'")
+            instructions.append((APPLY, OPERATORS[token]))
+            depth -= 1
+            continue
+
+        try:
+            instructions.append((PUSH, float(token)))
+        except ValueError:
+            if not token.isidentifier():
+                raise
+            instructions.append((LOAD, token))
+            if token not in variables:
+                variables.append(token)
+
+        depth += 1
+        max_depth = max(max_depth, depth)
+
+    if depth == 0:
+        raise IndexError("The expression is empty")
+    if depth > 1:
+        raise ValueError(f"Invalid postfix expression, {depth} operands are left without an operator")
+
+    return PostfixProgram(expression, tuple(instructions), tuple(variables), max_depth)
+
+
+@lru_cache(maxsize=PROGRAM_CACHE_SIZE)
+def compile_cached(expression: str) -> PostfixProgram:
+    """
+    Same as compile_postfix, but repeated expressions reuse the program compiled the first time.
+    """
+
+    return compile_postfix(expression)
+
+
 def postfix_calculator(expression: str) -> float:
     """
     Evaluates a postfix expression and returns the result.
@@ -17,31 +186,133 @@ def postfix_calculator(expression: str) -> float:
         12.999999999999984
     """
 
-    operators = ("+", "-", "*", "/", "^")
-    stack = []
+    return compile_cached(expression).evaluate()
 
-    for token in expression.split():
-        if token not in operators:
-            stack.append(float(token))
-        else:
-            b = stack.pop()
-            a = stack.pop()
-
-            if token == "+":
-                stack.append(a + b)
-            elif token == "-":
-                stack.append(a - b)
-            elif token == "*":
-                stack.append(a * b)
-            elif token == "/":
-                stack.append(a / b)
-            elif token == "^":
-                stack.append(a**b)
-
-    return stack.pop()
+
+def evaluate_chunk(expressions: list, variables: dict) -> list:
+    return [compile_postfix(expression).evaluate(variables) for expression in expressions]
+
+
+def evaluate_many(expressions: list, variables: dict = None, workers: int = None, chunk_size: int = 1000) -> list:
+    """
+    Evaluates many distinct postfix expressions, in parallel worker processes for large lists.
+    Args:
+        expressions (list): The postfix expressions to evaluate.
+        variables (dict): Values of the variables used by the expressions.
+        workers (int): Number of worker processes, the number of CPUs by default.
+        chunk_size (int): Expressions sent to a worker at a time.
+    Returns:
+        list: The result of each expression, in the same order.
+    Raises:
+        IndexError, ValueError, ZeroDivisionError: The first error raised by an expression.
+    Example:
+        >>> evaluate_many(["1 2 +", "x 2 ^"], {"x": 3})
+        [3.0, 9.0]
+    """
+
+    expressions = list(expressions)
+    if len(expressions) < PARALLEL_THRESHOLD or workers == 1:
+        return evaluate_chunk(expressions, variables)
+
+    chunks = [expressions[i : i + chunk_size] for i in range(0, len(expressions), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(evaluate_chunk, chunks, [variables] * len(chunks))
+        return [result for chunk in results for result in chunk]
+
+
+def read_lines(path: str):
+    """
+    Yields the lines of a file, or of the standard input if the path is "-", as bytes.
+    They are decoded by evaluate_stream, so an invalid line only fails itself.
+    Large files are memory-mapped, so they are never read into memory at once.
+    """
+
+    if path == "-":
+        yield from sys.stdin.buffer
+        return
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < MMAP_THRESHOLD:
+            yield from file
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+
+
+def evaluate_stream(lines, output, errors, source: str = "-") -> int:
+    """
+    Evaluates one postfix expression per line, writing one result per line to `output`.
+    Args:
+        lines (iterable): The lines to evaluate, as str or UTF-8 bytes.
+        output (file): Where the results are written. Failed lines are written as "ERROR".
+        errors (file): Where the error of each failed line is reported, with its line number.
+        source (str): Name of the input, used in the error messages.
+    Returns:
+        int: The number of lines that failed.
+    Example:
+        >>> import io
+        >>> evaluate_stream(["1 2 +", "1 +"], sys.stdout, io.StringIO())
+        3.0
+        ERROR
+        1
+    """
+
+    failed = 0
+    results = []
+
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            # UnicodeDecodeError is a ValueError, reported like the other errors
+            expression = (line.decode() if isinstance(line, bytes) else line).strip()
+            if not expression:
+                results.append("")
+                continue
+
+            results.append(str(compile_cached(expression).evaluate()))
+        except (ArithmeticError, IndexError, ValueError) as e:
+            results.append("ERROR")
+            errors.write(f"{source}:{line_number}: {type(e).__name__}: {e}\n")
+            failed += 1
+
+        if len(results) >= OUTPUT_BATCH_SIZE:
+            output.write("\n".join(results) + "\n")
+            results = []
+
+    if results:
+        output.write("\n".join(results) + "\n")
+
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluates postfix expressions")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help='Files with one expression per line, "-" for the standard input',
+    )
+    args = parser.parse_args()
+
+    if not args.files and sys.stdin.isatty():
+        expression = input("Enter a postfix expression: ")
+        result = postfix_calculator(expression)
+        print(f"Result: {result}")
+        return 0
+
+    output = open(sys.stdout.fileno(), "w", buffering=1024 * 1024, closefd=False)
+    failed = 0
+    with output:
+        for path in args.files or ["-"]:
+            try:
+                failed += evaluate_stream(read_lines(path), output, sys.stderr, path)
+            except OSError as e:
+                # The file is opened by the first read, before any of its results
+                sys.stderr.write(f"{path}: {e.strerror or e}\n")
+                failed += 1
+
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    expression = input("Enter a postfix expression: ")
-    result = postfix_calculator(expression)
-    print(f"Result: {result}")
+    sys.exit(main())